@@ -0,0 +1,61 @@
+"""
+Python Script designed to run every homework and clinic tour check of many courses (or sections) at once, without any prompts
+
+usage: python3 batchChecker.py MANIFEST [--output-dir OUTPUT_DIR] [--jobs JOBS] [--offline] [--cache-dir CACHE_DIR] [--cache-size MEGABYTES] [--no-cache] [--chunk-size ROWS]
+                               [--state-dir STATE_DIR] [--alias-dir ALIAS_DIR] [--assignment] [--cutoff N] [--regrade] [--streak N] [--stats PATH] [--stats-summary] [--profile PATH]
+
+example: python3 batchChecker.py courses.json --output-dir results
+
+Reads every course's roster, homework and clinic tour sheets from the JSON manifest (see suitcase/batch.py for its layout), loads each sheet once however many courses share it, runs every check on one pool of workers, and writes each check's results to its own directory:
+    OUTPUT_DIR/<course>/homeworks/      what homeworkChecker.py writes (students_without_submissions.txt, missed_homeworks.csv, missing_submissions.npz), and its report as report.txt
+    OUTPUT_DIR/<course>/<clinic tour>/  what clinicTourChecker.py writes (students_without_submissions.txt), and its report as report.txt
+Homeworks are graded incrementally, with the same grading state and alias tables as homeworkChecker.py -- flagged emails can't be confirmed here, so run homeworkChecker.py --confirm to vouch for them.
+
+All of the work is done by suitcase.batch (see suitcase/__init__.py) -- this script only reads the manifest and prints where each check's results went.
+
+Dependencies: the same as homeworkChecker.py
+"""
+
+import os
+import argparse
+from termcolor import colored, cprint
+
+from suitcase import instrument
+
+from suitcase.cli import add_loader_arguments, get_loader_options, add_grading_arguments, add_matching_arguments, add_instrument_arguments, start_recording, finish_recording
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('manifest',                                                             help="JSON file listing every course's roster, homework and clinic tour sheets")
+    parser.add_argument('--output-dir', default="batch_results",                                help="where each check's results are written, in a directory of its own (default: %(default)s)")
+    parser.add_argument('--jobs',       default=None, type=int,                                 help="how many checks to run at the same time (default: one per core)")
+    add_loader_arguments(parser)
+    add_grading_arguments(parser)
+    add_matching_arguments(parser)
+    parser.add_argument('--regrade',    action='store_true',                                    help="ignore (and overwrite) the saved grading state, and grade every response again")
+    parser.add_argument('--streak',     default=3, type=int,                                    help="also list the students who missed this many homeworks in a row (default: %(default)s)")
+    add_instrument_arguments(parser, "profile the matcher with cProfile (running one check at a time)")
+    args   = parser.parse_args()
+
+    #Only imported once the arguments are parsed, so --help never waits on numpy or pandas
+    from suitcase.batch import read_manifest, run_batch
+
+    jobs = read_manifest(args.manifest)
+
+    start_recording(args)
+
+    loader_options = get_loader_options(args)
+
+    #Profiling only sees this process, so every check is run in it
+    with instrument.profiling():
+        summary = run_batch(jobs, args.output_dir, loader_options, args.state_dir, args.alias_dir, args.regrade, args.streak, 1 if args.profile else args.jobs, args.assignment, args.cutoff)
+
+    cprint("========================================================================", 'blue')
+    for name, directory, num_missing in summary:
+        print(colored(name, 'green') + ": " + str(num_missing) + " students missing something -- see " + os.path.join(directory, 'report.txt'))
+    cprint("========================================================================", 'blue')
+
+    finish_recording(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Measures how long the tools take to start up from a cold interpreter, and checks each against its budget
+
+usage: python3 benchmarks/cold_start.py [--runs N] [--scale FACTOR]
+
+Every command is run --runs times in a fresh interpreter, and its median wall-clock time is compared to its budget (scaled by --scale, for slower machines).
+Exits with status 1 if any command is over budget.
+
+Dependencies: the same as homeworkChecker.py
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+#Seconds each command may take (its median over every run) -- --help and importing the package must never pay for numpy, pandas, scipy or requests
+BUDGETS = [
+    ('import suitcase',                 [sys.executable, '-c', 'import suitcase'],                         0.15),
+    ('homeworkChecker.py --help',       [sys.executable, 'homeworkChecker.py', '--help'],                  0.25),
+    ('clinicTourChecker.py --help',     [sys.executable, 'clinicTourChecker.py', '--help'],                0.25),
+    ('notifyByEmail.py --help',         [sys.executable, 'notifyByEmail.py', '--help'],                    0.25),
+    ('batchChecker.py --help',          [sys.executable, 'batchChecker.py', '--help'],                     0.25),
+    ('find_fuzzy_matches, 3 students',  [sys.executable, '-c', "from suitcase import find_fuzzy_matches; find_fuzzy_matches(['oski@berkeley.edu', 'kunalmishra9@gmail.com', 'rando@berkeley.edu'], ['oski@berkeley.edu', 'kunalmishr9@gmail.com'])"], 0.60),
+    ('homeworkChecker.py --report-only, 3 students', None,                                                  2.00),
+]
+
+def write_small_matrix(path):
+    """Saves a 3 student x 2 homework missing-submission matrix for --report-only to report on"""
+    sys.path.insert(0, REPO)
+    import numpy as np
+    import pandas as pd
+    from suitcase.report import save_missing_matrix
+
+    roster = pd.DataFrame({'Name': ['Oski Bear', 'Kunal Mishra', 'Rando'], 'Email': ['oski@berkeley.edu', 'kunalmishra9@gmail.com', 'rando@berkeley.edu'], 'UGSI': ['Alice', 'Bob', 'Alice']})
+    save_missing_matrix(path, roster, np.array([[False, True], [False, False], [True, True]]), [1, 2])
+
+def time_command(command, cwd, runs):
+    """Returns the median wall-clock time of running command (in cwd) runs times"""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True, env=dict(os.environ, PYTHONPATH=REPO))
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs',   default=5, type=int,        help="how many times to run each command (default: %(default)s)")
+    parser.add_argument('--scale',  default=1.0, type=float,    help="multiplies every budget, for slower machines (default: %(default)s)")
+    args   = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        matrix_path = os.path.join(scratch, 'missing_submissions.npz')
+        write_small_matrix(matrix_path)
+
+        over_budget = []
+        print("{:<48} {:>9} {:>9}".format('command', 'median', 'budget'))
+        for name, command, budget in BUDGETS:
+            if command is None:
+                command = [sys.executable, os.path.join(REPO, 'homeworkChecker.py'), '--report-only', '--matrix', matrix_path, '--results', os.path.join(scratch, 'missed_homeworks.csv')]
+            elapsed = time_command(command, scratch if '--report-only' in command else REPO, args.runs)
+            budget  = budget * args.scale
+
+            print("{:<48} {:>8.3f}s {:>8.3f}s{}".format(name, elapsed, budget, '' if elapsed <= budget else '  OVER BUDGET'))
+            if elapsed > budget:    over_budget.append(name)
+
+    if over_budget:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
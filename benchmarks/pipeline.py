@@ -0,0 +1,164 @@
+"""
+Times each stage of the homeworkChecker.py pipeline on synthetic classes of growing size, and checks its results against the students who really did miss each homework
+
+usage: python3 benchmarks/pipeline.py [--students N [N ...]] [--homeworks N] [--typo-rate RATE] [--duplicate-rate RATE] [--missing-rate RATE] [--stray-rate RATE]
+                                      [--jobs JOBS] [--seed SEED] [--output OUTPUT] [--compare BASELINE]
+
+example: python3 benchmarks/pipeline.py --students 100 1000 10000 --output after.json --compare before.json
+
+Each class is generated (see synthetic.py) and written out as CSV exports, then run through the same steps homeworkChecker.py takes:
+    load        parsing every exported sheet (see suitcase.loader.read_sheet)
+    normalize   indexing the roster's emails for matching (see suitcase.grading.build_roster_index)
+    match       grading every homework (see suitcase.grading.grade_homeworks)
+    aggregate   building and reporting on the missing-submission matrix (see suitcase.report)
+    output      writing the email list, the results CSV and the saved matrix
+clinicTourChecker.py runs the same load and match steps on a single sheet.
+
+Every run is checked against the generator's reference -- students reported missing who did submit (wrongly_missing) and students who didn't submit but were matched to someone else's submission (wrongly_matched).
+Typos and stray submitters can legitimately fool the matcher, but a class generated with neither has to come out exactly right, so the script exits with status 1 if one doesn't.
+
+The timings and checks are saved as JSON to --output, and --compare prints how every stage changed against a JSON file saved by an earlier version.
+
+Dependencies: the same as homeworkChecker.py
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import contextlib
+import subprocess
+from collections import OrderedDict
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+from synthetic import generate_class
+
+STAGES = ['load', 'normalize', 'match', 'aggregate', 'output']
+
+def run_pipeline(directory, num_homeworks, jobs=None):
+    """Runs the homeworkChecker.py pipeline on the roster.csv and hw<N>.csv exports in directory, and returns how long each stage took along with the roster emails found missing from each homework"""
+    from suitcase.loader import read_sheet
+    from suitcase.grading import build_roster_index, grade_homeworks
+    from suitcase.report import build_missing_matrix, save_missing_matrix, get_missed_homeworks, report_missing_homeworks
+
+    timings = OrderedDict()
+    clock   = time.perf_counter()
+    def lap(stage):
+        nonlocal clock
+        now             = time.perf_counter()
+        timings[stage]  = now - clock
+        clock           = now
+
+    paths = [os.path.join(directory, 'roster.csv')] + [os.path.join(directory, 'hw' + str(number) + '.csv') for number in range(1, num_homeworks + 1)]
+    frames = []
+    for path in paths:
+        with open(path, 'rb') as sheet_file:
+            frames.append( read_sheet(sheet_file.read()) )
+    roster, *homeworks = frames
+    lap('load')
+
+    roster_index = build_roster_index(roster['Email'])
+    lap('normalize')
+
+    #The matcher's warnings would drown out the timings
+    with contextlib.redirect_stdout(io.StringIO()):
+        students_without_submissions = grade_homeworks(roster_index, [homework['Email'] for homework in homeworks], [None] * num_homeworks, processes=jobs)
+        lap('match')
+
+        homework_numbers = list(range(1, num_homeworks + 1))
+        missing_matrix   = build_missing_matrix(roster['Email'], students_without_submissions)
+        output           = report_missing_homeworks(roster, missing_matrix, homework_numbers)
+        results          = get_missed_homeworks(roster, missing_matrix, homework_numbers)
+        lap('aggregate')
+
+    output.to_csv( os.path.join(directory, 'students_without_submissions.txt'), columns=["Email"], index=False, header=False )
+    results.to_csv( os.path.join(directory, 'missed_homeworks.csv'), index=False )
+    save_missing_matrix( os.path.join(directory, 'missing_submissions.npz'), roster, missing_matrix, homework_numbers )
+    lap('output')
+
+    return timings, [set(missing) for missing in students_without_submissions]
+
+def check_results(found, reference):
+    """Compares the students found missing from each homework with the students who really did miss it"""
+    wrongly_missing = sum(len(found_missing - really_missing) for found_missing, really_missing in zip(found, reference))
+    wrongly_matched = sum(len(really_missing - found_missing) for found_missing, really_missing in zip(found, reference))
+    return OrderedDict(exact=wrongly_missing == wrongly_matched == 0, wrongly_missing=wrongly_missing, wrongly_matched=wrongly_matched,
+                       missing=sum(len(really_missing) for really_missing in reference))
+
+def get_version():
+    """Returns the commit being benchmarked (marked dirty if the tree has uncommitted changes), or None outside of git"""
+    try:
+        return subprocess.run(['git', 'describe', '--always', '--dirty'], cwd=REPO, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(runs, baseline_runs):
+    """Prints how long every stage took relative to the run of the same configuration in baseline_runs"""
+    key       = lambda run: json.dumps(run['config'], sort_keys=True)
+    baselines = { key(run): run for run in baseline_runs }
+
+    print("\n{:>9} {:<10} {:>10} {:>10} {:>8}".format('students', 'stage', 'baseline', 'now', 'ratio'))
+    for run in runs:
+        baseline = baselines.get(key(run))
+        if baseline is None:    continue
+
+        for stage in STAGES + ['total']:
+            before, after = baseline['seconds'].get(stage), run['seconds'].get(stage)
+            if before is None or after is None: continue
+            print("{:>9} {:<10} {:>9.3f}s {:>9.3f}s {:>7.2f}x".format(run['config']['students'], stage, before, after, after / before if before else float('inf')))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--students',       default=[100, 1000, 10000, 100000], type=int, nargs='+', metavar='N', help="class sizes to benchmark (default: %(default)s)")
+    parser.add_argument('--homeworks',      default=4, type=int, metavar='N',       help="homeworks per class (default: %(default)s)")
+    parser.add_argument('--typo-rate',      default=0.02, type=float, metavar='RATE', help="chance a submission's email has a typo (default: %(default)s)")
+    parser.add_argument('--duplicate-rate', default=0.02, type=float, metavar='RATE', help="chance a student submits twice (default: %(default)s)")
+    parser.add_argument('--missing-rate',   default=0.1, type=float, metavar='RATE',  help="chance a student misses a homework (default: %(default)s)")
+    parser.add_argument('--stray-rate',     default=0.01, type=float, metavar='RATE', help="stray (non-roster) submissions, per submitter (default: %(default)s)")
+    parser.add_argument('--jobs',           default=None, type=int,                 help="how many homeworks to grade at the same time (default: one per core)")
+    parser.add_argument('--seed',           default=0, type=int,                    help="seed for the generator (default: %(default)s)")
+    parser.add_argument('--output',         default='pipeline_benchmark.json',      help="where the results are saved as JSON (default: %(default)s)")
+    parser.add_argument('--compare',        default=None, metavar='BASELINE',       help="a JSON file saved by an earlier run to compare against")
+    args   = parser.parse_args()
+
+    runs = []
+    print("{:>9} ".format('students') + ' '.join("{:>10}".format(stage) for stage in STAGES + ['total']) + "  check")
+    for num_students in args.students:
+        config = OrderedDict(students=num_students, homeworks=args.homeworks, typo_rate=args.typo_rate, duplicate_rate=args.duplicate_rate,
+                             missing_rate=args.missing_rate, stray_rate=args.stray_rate, seed=args.seed)
+
+        roster, homeworks, reference = generate_class(num_students, args.homeworks, args.typo_rate, args.duplicate_rate, args.missing_rate, args.stray_rate, seed=args.seed)
+        with tempfile.TemporaryDirectory() as directory:
+            roster.to_csv(os.path.join(directory, 'roster.csv'), index=False)
+            for number, homework in enumerate(homeworks, 1):
+                homework.to_csv(os.path.join(directory, 'hw' + str(number) + '.csv'), index=False)
+
+            timings, found = run_pipeline(directory, args.homeworks, args.jobs)
+
+        timings['total'] = sum(timings.values())
+        check            = check_results(found, reference)
+        runs.append( OrderedDict(config=config, seconds=timings, check=check) )
+
+        print("{:>9} ".format(num_students) + ' '.join("{:>9.3f}s".format(timings[stage]) for stage in STAGES + ['total'])
+              + "  " + ('exact' if check['exact'] else str(check['wrongly_missing']) + ' wrongly missing, ' + str(check['wrongly_matched']) + ' wrongly matched') + " (of " + str(check['missing']) + ")")
+
+    results = OrderedDict(version=get_version(), python=platform.python_version(), platform=platform.platform(), cpus=os.cpu_count(), time=time.strftime('%Y-%m-%dT%H:%M:%S%z'), runs=runs)
+    with open(args.output, 'w') as output_file:
+        json.dump(results, output_file, indent=4)
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            compare(runs, json.load(baseline_file)['runs'])
+
+    #Without typos or strays there is nothing to be fooled by
+    if args.typo_rate == 0 and args.stray_rate == 0 and not all(run['check']['exact'] for run in runs):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Generates realistic synthetic rosters and homework submission sheets, along with which students really did miss each homework
+
+Students submit with a chance of typing their email in wrong (typo_rate), submitting twice (duplicate_rate) or not at all (missing_rate), and some submissions come from people who aren't on the roster at all (stray_rate).
+Typos never touch the first letter of an email, and never turn it into someone else's email.
+"""
+
+import random
+import string
+import pandas as pd
+
+UGSIS     = ['Alice', 'Bob', 'Carol', 'Dan', 'Erin', 'Frank', 'Grace', 'Heidi']
+SYLLABLES = ['ka', 'lo', 'mi', 'na', 'ri', 'sa', 'to', 'vi', 'ze', 'ul', 'an', 'ek', 'or', 'sh', 'ch', 'ly', 'be', 'do']
+ANSWERS   = ['I think the answer is ' + word for word in ['yes', 'no', 'maybe', 'forty two', 'the mitochondria', 'it depends on the patient', 'see attached']]
+
+def make_name(rng, syllables):
+    return ''.join(rng.choice(SYLLABLES) for _ in range(syllables)).capitalize()
+
+def make_typo(rng, email):
+    """Returns email with one character of its local-part (never the first one) swapped, dropped, doubled or replaced"""
+    local, domain = email.split('@')
+    position      = rng.randrange(1, len(local))
+    kind          = rng.choice(['swap', 'drop', 'double', 'replace']) if position < len(local) - 1 else rng.choice(['drop', 'double', 'replace'])
+
+    if kind == 'swap':      local = local[:position] + local[position+1] + local[position] + local[position+2:]
+    elif kind == 'drop':    local = local[:position] + local[position+1:]
+    elif kind == 'double':  local = local[:position] + local[position] + local[position:]
+    else:                   local = local[:position] + rng.choice(string.ascii_lowercase.replace(local[position], '')) + local[position+1:]
+    return local + '@' + domain
+
+def generate_class(num_students, num_homeworks=4, typo_rate=0.02, duplicate_rate=0.02, missing_rate=0.1, stray_rate=0.01, answer_columns=5, seed=0):
+    """Returns a roster DataFrame (laid out like the exported roster sheet), a submissions DataFrame for each homework (laid out like the exported form responses, in submission order),
+    and, for each homework, the set of roster emails that really did not submit it
+
+    >>> roster, homeworks, missing = generate_class(50, num_homeworks=2, seed=1)
+    >>> len(roster), len(homeworks), roster.columns.tolist()[:4]
+    (50, 2, ['First Name', 'Last Name', 'Email Address', 'UGSI'])
+    >>> all( set(homework['Email Address']).isdisjoint(students) for homework, students in zip(homeworks, missing) )
+    True
+    """
+    rng = random.Random(seed)
+
+    first_names, last_names, emails = [], [], []
+    taken = set()
+    while len(emails) < num_students:
+        first_name, last_name = make_name(rng, rng.randint(1, 3)), make_name(rng, rng.randint(2, 4))
+        email = (first_name[0] + last_name + str(rng.randrange(100))).lower() + '@berkeley.edu'
+        if email in taken: continue
+
+        taken.add(email)
+        first_names.append(first_name)
+        last_names.append(last_name)
+        emails.append(email)
+
+    roster = pd.DataFrame({'First Name': first_names, 'Last Name': last_names, 'Email Address': emails, 'UGSI': [rng.choice(UGSIS) for _ in emails]})
+
+    homeworks, missing = [], []
+    for _ in range(num_homeworks):
+        submitters = [email for email in emails if rng.random() >= missing_rate]
+        missing.append( set(emails) - set(submitters) )
+
+        rows = []
+        for email in submitters:
+            if rng.random() < typo_rate:
+                typo = make_typo(rng, email)
+                if typo not in taken:   email = typo
+            rows.append(email)
+            if rng.random() < duplicate_rate:   rows.append(email)
+
+        for _ in range(int(stray_rate * len(submitters))):
+            rows.append( ''.join(rng.choices(string.ascii_lowercase, k=6)) + str(rng.randrange(1000)) + '@gmail.com' )
+
+        rng.shuffle(rows)
+        homework = pd.DataFrame({'Timestamp': [str(row) for row in range(len(rows))], 'Email Address': rows})
+        for column in range(answer_columns):
+            homework['Question ' + str(column + 1)] = [rng.choice(ANSWERS) for _ in rows]
+        homeworks.append(homework)
+
+    return roster, homeworks, missing
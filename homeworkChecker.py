@@ -1,9 +1,14 @@
 """
 Python Script designed to output names of all students who did not complete the homework
 
-usage: python3 homeworkChecker.py
+usage: python3 homeworkChecker.py [--offline] [--cache-dir CACHE_DIR] [--cache-size MEGABYTES] [--no-cache] [--chunk-size ROWS] [--state-dir STATE_DIR] [--alias-dir ALIAS_DIR] [--confirm] [--jobs JOBS] [--assignment] [--cutoff N] [--regrade]
+                                  [--first-homework N] [--streak N] [--matrix MATRIX] [--results RESULTS] [--report-only]
+                                  [--stats PATH] [--stats-summary] [--profile PATH]
 
 Outputs the name of each student who missed a homework, sorted by their UGSI and the number of homework assignments missed. In addition, creates a file named (students_without_submissions) that *only* contains their emails for easy copy/paste into an email reminder and or notification.
+All of the work is done by the suitcase package (see suitcase/__init__.py) -- this script only prompts for the sheets and wires its steps together.
+Which homeworks each student missed is also saved (as missing_submissions.npz), so that the report can be printed again with --report-only without regrading.
+Each student's email, name, UGSI and the numbers of every homework they missed are also written to missed_homeworks.csv, for notifyByEmail.py --digest.
 
 Dependencies: use python3 -m pip install [package1] [package2] [...]
     numpy
@@ -13,8 +18,9 @@ Dependencies: use python3 -m pip install [package1] [package2] [...]
     scipy
     fuzzywuzzy
     termcolor
+    requests
 
-Example: python3 -m pip install numpy datascience matplotlib pandas scipy fuzzywuzzy termcolor
+Example: python3 -m pip install numpy datascience matplotlib pandas scipy fuzzywuzzy termcolor requests
 
 Example of Homework Checking Roster File:   
     https://docs.google.com/spreadsheets/d/1w51h2umKCFJWbAVPUWw0HjtTaZVZ3H-qcj395t5oFZw/edit?usp=sharing
@@ -22,177 +28,113 @@ Example of Homework Submissions File:
     https://docs.google.com/spreadsheets/d/1AwTrX-xcn-kTpx9yfBtdkU4McitKRSt6Ct8TSg33Xr8/edit?usp=sharing
 """
 
-import sys
-import numpy as np
-import pandas as pd
 import os
-from termcolor import *
-from fuzzywuzzy import fuzz
-from fuzzywuzzy import process
-
-def load_data_into_frame(url):
-    #Doing some URL reformatting
-    separated       = url.split(sep='/')
-    gid             = separated[-1].split(sep='gid=')[-1]
-    separated[-1]    = 'export?gid=' + gid + '&format=csv'
-    reconstructed_url = '/'.join(separated)
-    
-    df = pd.read_csv(reconstructed_url)
-    
-    assert df is not None, "Data did not load!"
-
-    if "Email Address" in df.columns:                               df["Email"] = df["Email Address"]
-    if "First Name" in df.columns and "Last Name" in df.columns:    df["Name"]  = np.core.defchararray.add(df["First Name"].values.astype(str), df["Last Name"].values.astype(str))
-    
-    assert "Email" in df.columns, "The input file given did not have the correct structure -- it needs (at least) an 'Email' column but these were the columns given: " + str(df.columns.values.tolist())
-    cprint(".\n..\n...\nSuccess -- loading complete!\n", 'green')
-    return df
-
-def find_fuzzy_matches(all_emails, submission_emails):
-    """Given an array of all emails and an array of submission emails, uses fuzzy string matching to find all emails that did not submit
-    
-    ============Suite 1============
-    >>> all_emails        = ['kunalmishra9@gmail.com', 'kmishra9@berkeley.edu', 'oski@berkeley.edu']
-    >>> submission_emails = ['kunalmishra9@gmail.com', 'kmishra9@berkeley.edu', 'oski@berkeley.edu']
-    >>> find_fuzzy_matches(all_emails, submission_emails)
-    []
-    >>> submission_emails = ['kunalmishra9@gmial', 'kmishra9@berkeley.edu', 'oski@berkeley.edu']
-    >>> find_fuzzy_matches(all_emails, submission_emails)
-    []
-    >>> submission_emails = ['kunalmishra9@gmial ', 'kmishra9@berkeley', 'oski@berkeley.edu ']
-    >>> find_fuzzy_matches(all_emails, submission_emails)
-    []
-    
-    ============Suite 2============
-    >>> all_emails        = ['kunalmishra9@gmail.com', 'kmishra9@berkeley.edu', 'oski@berkeley.edu']
-    >>> submission_emails = ['oski@berkeley.edu ']
-    >>> find_fuzzy_matches(all_emails, submission_emails)
-    ['kunalmishra9@gmail.com', 'kmishra9@berkeley.edu']
-    >>> submission_emails = ['kmishra9@berkeley ','oski@berkeley.edu ']
-    >>> find_fuzzy_matches(all_emails, submission_emails)
-    ['kunalmishra9@gmail.com']
-    
-    ============Suite 3============
-    >>> all_emails        = ['kunalmishra9@gmail.com', 'kmishra9@berkeley.edu', 'oski@berkeley.edu']
-    >>> submission_emails = ['kunalmishra9@gmail.com', 'kmishra9@berkeley.edu', 'oski@berkeley.edu', 'rando@berkeley']
-    >>> find_fuzzy_matches(all_emails, submission_emails)
-    []
-    >>> submission_emails = ['kunalmishra9@gmail.com', 'oski@berkeley.edu', 'rando@berkeley']
-    >>> find_fuzzy_matches(all_emails, submission_emails)
-    **********
-    Please check on kmishra9@berkeley.edu. The most similar email we found in the submissions was rando@berkeley with a similarity score of 86 out of 100. 
-    **********
-    ['kmishra9@berkeley.edu']
-    """
-    # Sanitizing input email lists
-    submission_emails = [email for email in submission_emails if type(email) == str]
-    all_emails = [email for email in all_emails if type(email) == str]
-    
-    submission_emails = [student_email.split('@')[0] for student_email in submission_emails]
-    
-    num_students, num_submissions = len(all_emails), len(submission_emails)
-    
-    matches = [ process.extract(query=student_email.split('@')[0], choices=submission_emails) + [(student_email, -1)] for student_email in all_emails ] 
-    
-    #Removes all perfect matches -- need to take the top X matches, where X = submissions - perfect matches
-    get_top_similarity_score = lambda processed_query: processed_query[0][1]
-    get_most_similar_email   = lambda processed_query: processed_query[0][0]
-    get_email                = lambda processed_query: processed_query[-1][0]
-
-    
-    missing_submissions = [processed_query for processed_query in matches if get_top_similarity_score(processed_query) != 100]
-    num_missing_submissions = len(missing_submissions)
-    
-    #False negatives -- people inputted their email incorrectly
-    if num_missing_submissions + num_submissions > num_students:
-        num_false_negatives = num_missing_submissions + num_submissions - num_students 
-        
-        missing_submissions = sorted( missing_submissions, key=lambda processed_query: processed_query[0][1], reverse=True )
-        
-        
-        count = 0
-        flagged = []
-        for missing_submission in missing_submissions:
-            if (get_top_similarity_score(missing_submission) < 80 or get_most_similar_email(missing_submission)[0] != get_email(missing_submission)[0]) and count < num_false_negatives:
-                cprint("**********", 'blue')
-                cprint("Please check on " + get_email(missing_submission) + ". The most similar email we found was suspicious", 'red' )
-                cprint("**********", 'blue')
-                print("")
-                
-                flagged.append(missing_submission)
-                
-            count += 1
-            
-        #Getting rid of false negatives (people who were the closest fuzzy matches)
-        missing_submissions = missing_submissions[num_false_negatives:] + flagged
-
-    #Logical error or issue with input files    
-    elif num_missing_submissions + num_submissions < num_students:
-        error_msg =  "Something went wrong -- most likely, your roster is incomplete or a student submitted twice, please correct the input files\n\n"
-        error_msg += "Here are the students with 'missing' submissions' " + str(missing_submissions) 
-        assert False, error_msg
-    
-    missing_submissions = [get_email(processed_query) for processed_query in missing_submissions]
-    
-    return missing_submissions
-
-try:
-    os.system('clear')
-
-    roster_url = input("Please input the URL of the Google Sheet with the " + colored('Suitcase Class Roster', 'green') + ":\n")
-    roster     = load_data_into_frame(roster_url)
-    
-    homework_responses = []
-    while True:
-        homework_response_url = input("Please input the URL of the Google Sheet with " + colored('each Homework submission', 'green') + " you would like to grade. Press 'Enter' after each one and press '.' when you are done:\n")
-        if homework_response_url == "" or homework_response_url == ".":
-            if len(homework_responses) == 0:    quit()
-            else:                               break
-            
-        homework_responses.append( load_data_into_frame(homework_response_url) )
-
-except:
-    os.system('clear')
-    error_msg  = colored('Something went wrong while trying to load the data', 'red') + ' in from the URL!\n\n'
-    error_msg += "Make sure:\n\t1) the URL is from the " + colored("URL BAR", 'red') + " (for the sheet)"
-    error_msg += "\n\t2) you have clicked " + colored('Share', 'red') + " and " + colored('Get Shareable Link', 'red') + " (for the sheet)\n"
-    print(error_msg)
-    quit()
-
-#Getting students who are on class roster but didn't submit this homework
-all_student_emails = set( roster['Email'] )
-all_submitted_student_emails = [set(homework_response['Email']) for homework_response in homework_responses]
-students_without_submissions = [find_fuzzy_matches(all_student_emails, submitted_student_emails) for submitted_student_emails in all_submitted_student_emails]
-
-#Figuring out the number of times each student missed a homework
-missed_homeworks = dict()       #Maps from student's email -> # of missed homeworks
-
-for student_set in students_without_submissions:
-    for student in student_set:
-
-        if student not in missed_homeworks:
-            missed_homeworks[student] = 0
-        missed_homeworks[student] += 1
-
-#Get all students who missed homework and sort them by their UGSI, and the number of homeworks they've missed
-columns = ["Name", "Email", "UGSI"]
-assert all(column in roster.columns for column in columns), "Structure of Roster File is incorrect -- need the following columns:\n\t" + str(columns)
-
-output = roster[ roster['Email'].isin(missed_homeworks.keys()) ].reset_index()
-
-output['Num missing'] = [ missed_homeworks[student] for student in output['Email'] ]
-
-output = output.sort_values(by=["Num missing", "UGSI"], ascending=False)
-
-cprint("========================================================================", 'blue')
-print( output[columns+['Num missing']].head(len(output)) )
-cprint("========================================================================", 'blue')
-
-#Outputting emails into a file
-path = "students_without_submissions.txt"
-output.to_csv( path, columns=["Email"], index=False, header=False )
+import argparse
+from termcolor import colored
+
+from suitcase import instrument
+
+from suitcase.cli import add_loader_arguments, get_loader_options, add_grading_arguments, add_matching_arguments, add_instrument_arguments, start_recording, finish_recording
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    add_loader_arguments(parser)
+    add_grading_arguments(parser)
+    parser.add_argument('--confirm',    action='store_true',                                    help="ask about every flagged email, and remember the ones you confirm")
+    parser.add_argument('--jobs',       default=None, type=int,                                 help="how many homeworks to grade at the same time (default: one per core)")
+    add_matching_arguments(parser)
+    parser.add_argument('--regrade',    action='store_true',                                    help="ignore (and overwrite) the saved grading state, and grade every response again")
+    parser.add_argument('--first-homework', default=1, type=int,                                help="the homework number of the first homework sheet (default: %(default)s)")
+    parser.add_argument('--streak',     default=3, type=int,                                    help="also list the students who missed this many homeworks in a row (default: %(default)s)")
+    parser.add_argument('--matrix',     default="missing_submissions.npz",                      help="where the students x homeworks table of missed homeworks is saved (default: %(default)s)")
+    parser.add_argument('--results',    default="missed_homeworks.csv",                         help="where the homeworks each student missed are listed, for notifyByEmail.py --digest (default: %(default)s)")
+    parser.add_argument('--report-only', action='store_true',                                   help="report on the table saved by the last run instead of grading again")
+    add_instrument_arguments(parser, "profile the matcher with cProfile (grading one homework at a time)")
+    args   = parser.parse_args()
+
+    #Only imported once the arguments are parsed, so --help never waits on numpy or pandas
+    from suitcase.loader import load_data_into_frames
+    from suitcase.grading import get_state_path, build_roster_index, load_aliases, save_aliases, ask_to_confirm, grade_homeworks
+    from suitcase.report import build_missing_matrix, save_missing_matrix, load_missing_matrix, get_missed_homeworks, report_missing_homeworks
+
+    start_recording(args)
+
+    loader_options = get_loader_options(args)
+
+    if args.report_only:
+        roster, missing_matrix, homework_numbers = load_missing_matrix(args.matrix)
+    else:
+        try:
+            os.system('clear')
+
+            roster_url = input("Please input the URL of the Google Sheet with the " + colored('Suitcase Class Roster', 'green') + ":\n")
+
+            homework_response_urls = []
+            while True:
+                homework_response_url = input("Please input the URL of the Google Sheet with " + colored('each Homework submission', 'green') + " you would like to grade. Press 'Enter' after each one and press '.' when you are done:\n")
+                if homework_response_url == "" or homework_response_url == ".":
+                    if len(homework_response_urls) == 0:    return
+                    else:                                   break
+
+                homework_response_urls.append(homework_response_url)
+
+            #Every sheet is downloaded at once, over the same connections
+            roster, *homework_responses = load_data_into_frames([roster_url] + homework_response_urls, **loader_options)
+
+        except:
+            os.system('clear')
+            error_msg  = colored('Something went wrong while trying to load the data', 'red') + ' in from the URL!\n\n'
+            error_msg += "Make sure:\n\t1) the URL is from the " + colored("URL BAR", 'red') + " (for the sheet)"
+            error_msg += "\n\t2) you have clicked " + colored('Share', 'red') + " and " + colored('Get Shareable Link', 'red') + " (for the sheet)"
+            error_msg += "\n\t3) if you are running " + colored('--offline', 'red') + ", every sheet was already loaded once while online\n"
+            print(error_msg)
+            return
+
+        columns = ["Name", "Email", "UGSI"]
+        assert all(column in roster.columns for column in columns), "Structure of Roster File is incorrect -- need the following columns:\n\t" + str(columns)
+
+        #Getting students who are on class roster but didn't submit this homework -- indexed in roster order (without duplicates), so ties between typos always go the same way
+        roster_index                 = build_roster_index(dict.fromkeys(roster['Email']))
+        all_submitted_student_emails = [homework_response['Email'] for homework_response in homework_responses]
+        state_paths                  = [get_state_path(args.state_dir, url) for url in homework_response_urls]
+
+        if args.regrade:
+            for state_path in state_paths:
+                if os.path.isfile(state_path):  os.remove(state_path)
+
+        roster_version = roster_index.version
+        aliases        = load_aliases(args.alias_dir, roster_version)
+        confirm        = ask_to_confirm if args.confirm else None
+
+        #Profiling only sees this process, so every homework is graded in it
+        with instrument.profiling():
+            students_without_submissions = grade_homeworks(roster_index, all_submitted_student_emails, state_paths, aliases, confirm, 1 if args.profile else args.jobs, args.assignment, args.cutoff)
+        save_aliases(args.alias_dir, roster_version, aliases)
+
+        homework_numbers = list( range(args.first_homework, args.first_homework + len(homework_responses)) )
+
+    #Get all students who missed homework and sort them by the number of homeworks they've missed, and their UGSI
+    with instrument.stage('aggregate', students=len(roster), homeworks=len(homework_numbers)):
+        #Marking which homeworks each student missed (unless the saved table is being reported on)
+        if not args.report_only:
+            missing_matrix = build_missing_matrix(roster['Email'], students_without_submissions)
+
+        output  = report_missing_homeworks(roster, missing_matrix, homework_numbers, args.streak)
+        results = get_missed_homeworks(roster, missing_matrix, homework_numbers)
+
+    with instrument.stage('output', files=2 if args.report_only else 3, rows=len(output) + len(results)):
+        #Saving which homeworks each student missed, so later reports don't need to regrade
+        if not args.report_only:
+            save_missing_matrix(args.matrix, roster, missing_matrix, homework_numbers)
+
+        #Outputting emails into a file
+        path = "students_without_submissions.txt"
+        output.to_csv( path, columns=["Email"], index=False, header=False )
+
+        #Outputting which homeworks each student missed, so they can each be sent one reminder about all of them
+        results.to_csv( args.results, index=False )
+
+    finish_recording(args)
 
 if __name__ == "__main__":
-    #import doctest
-    #doctest.testmod()
-    ""
\ No newline at end of file
+    main()
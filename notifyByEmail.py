@@ -1,68 +1,122 @@
 """
 Python Script designed to notify all students who did not complete the homework
 
-usage: python3 notifyByEmail.py
+usage: python3 notifyByEmail.py [--digest [RESULTS]] [--host HOST] [--port PORT] [--no-tls] [--no-login] [--connections N] [--rate PER_SECOND] [--connection-rate PER_SECOND]
+                                [--retries N] [--backoff SECONDS] [--journal JOURNAL] [--resume [RUN]] [--resend-uncertain]
 
 example: python3 notifyByEmail.py
 
-Given a directory containing a students_without_submissions.txt that has a set of emails for students who are missing submissions, 
+Given a directory containing a students_without_submissions.txt that has a set of emails for students who are missing submissions,
 emails them a generic message letting them know we didn't receive the homework and that they need to complete the HW ASAP.
 
-Dependencies: None! 
+With --digest, reads the missed_homeworks.csv written by homeworkChecker.py instead, and sends every student a single email covering all of the homeworks they missed.
+
+Emails are sent over a few SMTP connections at once, within the rate limits given, and every email sent is recorded, under the id of the run that sent it, in an append-only journal (sent_emails.journal).
+Every run is a new send -- rerunning with --resume after a failure (or a crash) picks the last run back up instead, and only emails the students it hadn't emailed yet. Anyone whose email may or may not have gone out is listed instead of being emailed twice.
+
+All of the work is done by suitcase.mailer (see suitcase/__init__.py) -- this script only prompts for the email and wires its steps together.
+
+Dependencies: None!
 
 Resources & Inspiration
     http://naelshiab.com/tutorial-send-email-python/
     https://docs.python.org/3/library/email-examples.html
 """
 
+import argparse
+import threading
 import smtplib
-from email.mime.text import MIMEText
 import termcolor
-import os
-
-def get_recipients():
-    path = 'students_without_submissions.txt'
-    assert os.path.isfile(path), "Uh-oh... it looks like you don't have a file titled '" +path+ "'. Please make sure you run homeworkChecker.py first before using the Automated Email Reminder system."
-    
-    recipients_file = open(path, 'r')
-    return recipients_file.readlines()
-
-server = smtplib.SMTP('smtp.gmail.com:587')
-server.ehlo()
-server.starttls()
-user_email, user_pass = 'suitcaseclass' + '@' 'gmai' + 'l.com', 'sweetcase' + 'class!'
-try:
-    server.login(user_email, user_pass)                                             #Fixes any login issues: https://accounts.google.com/DisplayUnlockCaptcha
-except:
-    print("\nError - was unable to log in due to login permissions or invalid user credentials. Please ensure the following are correct:")
-    print("Email:", user_email)
-    print("Pswd:", user_pass)
-    print("If credentials are valid, please visit the following URL: https://accounts.google.com/DisplayUnlockCaptcha")
-    quit()
-
-homework_number    = input("What homework number are you emailing about?\n").strip()
-assert 0 <= int(homework_number) <= 16, 'Invalid homework number inputted -- should be an integer between 0 and 16. Quitting...'
-CD_initials        = input("What are the CD Initials for this semester?\n").strip().upper()
-assert len(CD_initials) == 4
-
-recipients = get_recipients()
-
-for recipient in recipients:
-
-    #Example email body: https://docs.google.com/document/d/1ZIb9yZK-MxvVsqHYSn7jzIarDoOGT6oZ-0_9DRtYM4M/edit?usp=sharing
-    msg = "Hey y'all,\n\n"
-    msg+= "Just reaching out to let you know we didn't receive a HW" +homework_number+ " submission from you.\n\n"
-    msg+= "If you think this is a mistake, please let us know. Otherwise, please complete last week's homework as soon as you can.\n\n"
-    msg+= CD_initials
-    
-    msg = MIMEText(msg)
-    
-    msg['Subject'] = '[Action Required] HW' + homework_number + ' Submission Missing'
-    msg['From']    = user_email
-    msg['To']      = recipient
-
-    server.send_message(msg)
-    
-print("Reminder emails have been sent!")
-
-server.quit()
\ No newline at end of file
+from email.mime.text import MIMEText
+
+from suitcase.mailer import REMINDER_SUBJECT, REMINDER_BODY, get_recipients, get_digest_recipients, render_digest, RateLimiter, new_run, read_journal, queue_emails, connect, send_emails
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--digest',             nargs='?', const='missed_homeworks.csv', metavar='RESULTS', help="send one email per student covering every homework they missed, as listed in RESULTS (default: %(const)s)")
+    parser.add_argument('--host',               default='smtp.gmail.com',                   help="SMTP server to send through (default: %(default)s)")
+    parser.add_argument('--port',               default=587, type=int,                      help="port of the SMTP server (default: %(default)s)")
+    parser.add_argument('--no-tls',             action='store_true',                        help="don't use STARTTLS (e.g. for a local test server)")
+    parser.add_argument('--no-login',           action='store_true',                        help="don't log in (e.g. for a local test server)")
+    parser.add_argument('--connections',        default=4, type=int, metavar='N',           help="how many SMTP connections to send over at once (default: %(default)s)")
+    parser.add_argument('--rate',               default=5.0, type=float, metavar='PER_SECOND', help="most emails sent per second, overall -- 0 means no limit (default: %(default)s)")
+    parser.add_argument('--connection-rate',    default=2.0, type=float, metavar='PER_SECOND', help="most emails sent per second, per connection -- 0 means no limit (default: %(default)s)")
+    parser.add_argument('--retries',            default=3, type=int, metavar='N',           help="how many times to retry an email that couldn't be sent (default: %(default)s)")
+    parser.add_argument('--backoff',            default=1.0, type=float, metavar='SECONDS', help="how long to wait before the first retry -- doubled for every retry after that (default: %(default)s)")
+    parser.add_argument('--journal',            default='sent_emails.journal',              help="where every email sent is recorded (default: %(default)s)")
+    parser.add_argument('--resume',             nargs='?', const='', default=None, metavar='RUN', help="pick up the run with this id (default: the last run in the journal) where it left off, instead of starting a new one")
+    parser.add_argument('--resend-uncertain',   action='store_true',                        help="with --resume, also email the students whose email may or may not have gone out when the run crashed")
+    args   = parser.parse_args()
+
+    statuses, last_run = read_journal(args.journal)
+    if args.resume is None:     run = new_run()
+    elif args.resume:           run = args.resume
+    elif last_run is not None:  run = last_run
+    else:
+        print("There is no run in " + args.journal + " to resume.")
+        return
+
+    user_email, user_pass = 'suitcaseclass' + '@' 'gmai' + 'l.com', 'sweetcase' + 'class!'
+    try:
+        server = connect(args, (user_email, user_pass))
+    except smtplib.SMTPException:
+        print("\nError - was unable to log in due to login permissions or invalid user credentials. Please ensure the following are correct:")
+        print("Email:", user_email)
+        print("Pswd:", user_pass)
+        print("If credentials are valid, please visit the following URL: https://accounts.google.com/DisplayUnlockCaptcha")
+        return
+
+    if args.digest:
+        recipients = get_digest_recipients(args.digest)
+    else:
+        homework_number    = input("What homework number are you emailing about?\n").strip()
+        assert 0 <= int(homework_number) <= 16, 'Invalid homework number inputted -- should be an integer between 0 and 16. Quitting...'
+        recipients = [ (recipient, [homework_number]) for recipient in get_recipients() ]
+    CD_initials        = input("What are the CD Initials for this semester?\n").strip().upper()
+    assert len(CD_initials) == 4
+
+    emails = []
+    for recipient, homework_numbers in recipients:
+
+        if args.digest:     subject, body = render_digest(homework_numbers, CD_initials)
+        else:               subject, body = REMINDER_SUBJECT.substitute(homework_number=homework_number), REMINDER_BODY.substitute(homework_number=homework_number, CD_initials=CD_initials)
+
+        msg = MIMEText(body)
+
+        msg['Subject'] = subject
+        msg['From']    = user_email
+        msg['To']      = recipient
+
+        emails.append( ((run, subject, recipient), msg) )
+
+    #Skipping anyone this run already emailed before it was cut short
+    pending, already, uncertain = queue_emails(emails, statuses, args.resend_uncertain)
+
+    num_pending    = pending.qsize()
+    global_limiter = RateLimiter(args.rate)
+    journal_lock   = threading.Lock()
+
+    with open(args.journal, 'a') as journal_file:
+        #The connection used to check the login is handed to the first sender
+        senders = [ threading.Thread(target=send_emails, args=(pending, args, global_limiter, journal_file, journal_lock, (user_email, user_pass), server if i == 0 else None)) for i in range(max(1, min(args.connections, num_pending))) ]
+        for sender in senders:  sender.start()
+        for sender in senders:  sender.join()
+
+    statuses, _ = read_journal(args.journal)
+    failed      = [key[2] for key, msg in emails if statuses.get(key) == 'failed']
+
+    print("Reminder emails have been sent! They were recorded as run " + run + " in " + args.journal + ".")
+
+    if already:
+        termcolor.cprint("These students were already emailed by this run before it stopped, so they were skipped:", 'yellow')
+        print("\n".join(already))
+
+    if uncertain:
+        termcolor.cprint("We may or may not have already emailed these students before this run crashed, so they were skipped (rerun with --resume --resend-uncertain to email them anyway):", 'red')
+        print("\n".join(uncertain))
+    if failed:
+        termcolor.cprint("These emails could not be sent -- rerun with --resume " + run + " to try them again:", 'red')
+        print("\n".join(failed))
+
+if __name__ == "__main__":
+    main()
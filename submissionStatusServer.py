@@ -0,0 +1,78 @@
+"""
+Python Script designed to answer "did this student submit?" questions from memory, without regrading every time
+
+usage: python3 submissionStatusServer.py [--roster URL] [--homework URL [URL ...]] [--host HOST] [--port PORT] [--refresh SECONDS] [--first-homework N] [--verbose]
+                                         [--offline] [--cache-dir CACHE_DIR] [--cache-size MEGABYTES] [--no-cache] [--chunk-size ROWS] [--state-dir STATE_DIR] [--alias-dir ALIAS_DIR]
+                                         [--assignment] [--cutoff N]
+
+example: python3 submissionStatusServer.py --port 8000
+         curl 'http://127.0.0.1:8000/status?email=oski@berkeley.edu&homework=3'
+         curl 'http://127.0.0.1:8000/missing?homework=3&ugsi=Alice'
+
+Loads the roster and homework sheets (asking for their URLs, like homeworkChecker.py, unless they're given as arguments) and grades them once, then answers queries about them over a local HTTP/JSON API until stopped with Ctrl-C:
+    /status?email=EMAIL[&homework=N]        the student's name, UGSI and missed homeworks (and whether they submitted homework N)
+    /missing[?homework=N][&ugsi=UGSI]       every student missing homework N (or any homework), optionally only from one UGSI's section
+    /health                                 when the sheets were last refreshed, and the last refresh error (if any)
+The sheets are refreshed in the background every --refresh seconds, sharing homeworkChecker.py's cache, grading state and alias table, so only new responses are ever graded -- give it the same --assignment and --cutoff as homeworkChecker.py, or each will regrade every response the other saved.
+
+All of the work is done by suitcase.service (see suitcase/__init__.py) -- this script only prompts for the sheets and starts the server.
+
+Dependencies: the same as homeworkChecker.py
+"""
+
+import argparse
+import threading
+from termcolor import colored, cprint
+
+from suitcase.cli import add_loader_arguments, get_loader_options, add_grading_arguments, add_matching_arguments
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--roster',     default=None, metavar='URL',                            help="URL of the Google Sheet with the class roster (asked for if not given)")
+    parser.add_argument('--homework',   default=[], nargs='+', metavar='URL',                   help="URLs of the Google Sheets with each homework's submissions, in order (asked for if not given)")
+    parser.add_argument('--host',       default='127.0.0.1',                                    help="address to answer queries on (default: %(default)s)")
+    parser.add_argument('--port',       default=8000, type=int,                                 help="port to answer queries on (default: %(default)s)")
+    parser.add_argument('--refresh',    default=300, type=float, metavar='SECONDS',             help="how often the sheets are reloaded in the background -- 0 never reloads them (default: %(default)s)")
+    parser.add_argument('--first-homework', default=1, type=int,                                help="the homework number of the first homework sheet (default: %(default)s)")
+    parser.add_argument('--verbose',    action='store_true',                                    help="log every query")
+    add_loader_arguments(parser)
+    add_grading_arguments(parser)
+    add_matching_arguments(parser)
+    args   = parser.parse_args()
+
+    #Only imported once the arguments are parsed, so --help never waits on numpy or pandas
+    from suitcase.service import SubmissionStatus, make_server
+
+    roster_url, homework_response_urls = args.roster, list(args.homework)
+    if roster_url is None:
+        roster_url = input("Please input the URL of the Google Sheet with the " + colored('Suitcase Class Roster', 'green') + ":\n")
+    while not homework_response_urls:
+        homework_response_url = input("Please input the URL of the Google Sheet with " + colored('each Homework submission', 'green') + ". Press 'Enter' after each one and press '.' when you are done:\n")
+        while homework_response_url not in ("", "."):
+            homework_response_urls.append(homework_response_url)
+            homework_response_url = input()
+
+    loader_options = get_loader_options(args)
+    status         = SubmissionStatus(roster_url, homework_response_urls, args.first_homework, loader_options, args.state_dir, args.alias_dir, args.assignment, args.cutoff)
+
+    #The first load has to work -- later ones that fail just keep the last good snapshot
+    status.refresh()
+    print(status.output, end='')
+
+    server = make_server(status, args.host, args.port, args.verbose)
+    stop   = threading.Event()
+    if args.refresh > 0:
+        threading.Thread(target=status.refresh_every, args=(args.refresh, stop), daemon=True).start()
+
+    cprint("Answering queries on http://" + args.host + ":" + str(server.server_port) + "/ -- press Ctrl-C to stop", 'green')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        server.server_close()
+        status.close()
+
+if __name__ == "__main__":
+    main()
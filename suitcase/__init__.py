@@ -0,0 +1,49 @@
+"""
+The Suitcase Class tools as a library -- homeworkChecker.py, clinicTourChecker.py, notifyByEmail.py, submissionStatusServer.py and batchChecker.py are thin command line wrappers around it.
+
+    cache       where the tools keep things between runs, and the on-disk cache of parsed sheets
+    loader      loads (and caches) Google Sheets into DataFrames
+    matcher     finds the students on a roster who did not submit, even through typos
+    grading     grades homeworks incrementally, remembering the typos resolved for each roster
+    report      reports on the (students x homeworks) matrix of missed homeworks
+    mailer      sends rate-limited, journaled reminder emails
+    service     answers submission-status queries over HTTP from sheets kept warm in memory
+    batch       runs every check of a manifest of courses in one process, loading each sheet once
+    instrument  opt-in stage timings, counters and profiling
+    cli         the command line options the tools share
+
+Importing the package costs next to nothing -- each module (and the numpy, pandas, scipy or requests it needs) is only imported once one of its names is first used, e.g.
+
+    >>> from suitcase import normalize_email
+    >>> normalize_email('Oski@berkeley.edu')
+    'oski'
+"""
+
+import importlib
+
+_MODULES = ['cache', 'loader', 'matcher', 'grading', 'report', 'mailer', 'service', 'batch', 'instrument', 'cli']
+
+_EXPORTS = {
+    'cache':    ['CACHE_ROOT', 'SHEET_CACHE_DIR', 'SHEET_CACHE_MAX_BYTES', 'GRADING_STATE_DIR', 'ALIAS_TABLE_DIR', 'evict_cache'],
+    'loader':   ['get_export_url', 'normalize_frame', 'read_sheet', 'fetch_frame', 'load_data_into_frames', 'load_data_into_frame'],
+    'matcher':  ['normalize_email', 'build_similarity_matrix', 'assign_typos', 'find_fuzzy_matches'],
+    'grading':  ['RosterIndex', 'build_roster_index', 'get_roster_version', 'get_state_path', 'grade_homework', 'grade_homeworks',
+                 'load_aliases', 'save_aliases', 'ask_to_confirm'],
+    'report':   ['build_missing_matrix', 'save_missing_matrix', 'load_missing_matrix', 'get_missed_homeworks', 'report_missing_homeworks'],
+    'mailer':   ['RateLimiter', 'get_recipients', 'get_digest_recipients', 'render_digest', 'new_run', 'read_journal', 'queue_emails', 'send_emails'],
+    'service':  ['SubmissionStatus', 'make_server'],
+    'batch':    ['HomeworkJob', 'ClinicTourJob', 'get_jobs', 'read_manifest', 'run_batch'],
+}
+_MODULE_OF = { name: module for module, names in _EXPORTS.items() for name in names }
+
+__all__ = _MODULES + list(_MODULE_OF)
+
+def __getattr__(name):
+    if name in _MODULES:
+        return importlib.import_module('.' + name, __name__)
+    if name in _MODULE_OF:
+        return getattr(importlib.import_module('.' + _MODULE_OF[name], __name__), name)
+    raise AttributeError("module " + repr(__name__) + " has no attribute " + repr(name))
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,231 @@
+"""
+Runs every check of a manifest in one process -- each course's homeworks and clinic tours are planned as jobs, every sheet is loaded once however many jobs share it, every reconciliation (a homework against a roster, or attendees against applications) is run once on a shared pool of workers,
+and each job writes its own output directory.
+
+A manifest is a JSON file laid out like
+
+    {
+        "courses": [
+            {
+                "name":           "section-101",
+                "roster":         "https://docs.google.com/spreadsheets/d/.../edit#gid=0",
+                "homeworks":      ["https://docs.google.com/spreadsheets/d/.../edit#gid=0", "..."],
+                "first_homework": 1,
+                "clinic_tours":   [ {"name": "spring", "applications": "https://...", "attendees": "https://..."} ]
+            }
+        ]
+    }
+
+where everything but a course's name is optional -- each course becomes a <name>/homeworks job (if it has a roster and homeworks) and a <name>/<tour name> job for each clinic tour (named clinic-tour-1, clinic-tour-2... unless given a name).
+"""
+
+import io
+import os
+import json
+import contextlib
+from collections import namedtuple, Counter
+from concurrent.futures import ProcessPoolExecutor
+from termcolor import cprint
+
+from . import instrument
+from .cache import GRADING_STATE_DIR, ALIAS_TABLE_DIR
+from .loader import get_export_url
+
+#What each job checks, and the name its output directory goes by
+HomeworkJob   = namedtuple('HomeworkJob', ['name', 'roster', 'homeworks', 'first_homework'])
+ClinicTourJob = namedtuple('ClinicTourJob', ['name', 'applications', 'attendees'])
+
+def get_jobs(manifest):
+    """Given a parsed manifest, returns every job it asks for, in manifest order
+
+    >>> jobs = get_jobs({'courses': [{'name': 'sp19', 'roster': 'R', 'homeworks': ['H1', 'H2'], 'clinic_tours': [{'applications': 'A', 'attendees': 'T'}]}]})
+    >>> [job.name for job in jobs], jobs[0]
+    (['sp19/homeworks', 'sp19/clinic-tour-1'], HomeworkJob(name='sp19/homeworks', roster='R', homeworks=['H1', 'H2'], first_homework=1))
+    """
+    assert type(manifest) == dict and type(manifest.get('courses')) == list, "Structure of the manifest is incorrect -- it needs a list of 'courses'"
+
+    jobs = []
+    for course in manifest['courses']:
+        name = course.get('name')
+        assert type(name) == str and name not in ('', '.', '..') and '/' not in name, "Every course in the manifest needs a 'name' that can be used as a directory name, but one was given " + repr(name)
+
+        if course.get('roster') and course.get('homeworks'):
+            jobs.append( HomeworkJob(name + '/homeworks', course['roster'], list(course['homeworks']), course.get('first_homework', 1)) )
+
+        for number, tour in enumerate(course.get('clinic_tours', []), 1):
+            assert 'applications' in tour and 'attendees' in tour, "Every clinic tour of " + name + " needs its 'applications' and 'attendees' sheets"
+            jobs.append( ClinicTourJob(name + '/' + tour.get('name', 'clinic-tour-' + str(number)), tour['applications'], tour['attendees']) )
+
+    names = Counter(job.name for job in jobs)
+    assert all(count == 1 for count in names.values()), "Every job in the manifest needs its own name, but these were given twice: " + str([name for name, count in names.items() if count > 1])
+    return jobs
+
+def read_manifest(path):
+    """Returns every job asked for by the manifest saved at path (see get_jobs)"""
+    with open(path) as manifest_file:
+        return get_jobs(json.load(manifest_file))
+
+def get_sheets(jobs):
+    """Returns every sheet the jobs read, as a dict mapping each of their URLs to the first URL the same sheet was given by (see get_export_url)
+
+    >>> get_sheets([ClinicTourJob('a', 'https://s/d/1/edit#gid=0', 'https://s/d/2/edit#gid=0'), ClinicTourJob('b', 'https://s/d/1/edit?gid=0', 'https://s/d/3/edit#gid=0')])
+    {'https://s/d/1/edit#gid=0': 'https://s/d/1/edit#gid=0', 'https://s/d/2/edit#gid=0': 'https://s/d/2/edit#gid=0', 'https://s/d/1/edit?gid=0': 'https://s/d/1/edit#gid=0', 'https://s/d/3/edit#gid=0': 'https://s/d/3/edit#gid=0'}
+    """
+    first_urls, sheets = dict(), dict()
+    for job in jobs:
+        urls = [job.roster] + job.homeworks if isinstance(job, HomeworkJob) else [job.applications, job.attendees]
+        for url in urls:
+            sheets[url] = first_urls.setdefault(get_export_url(url), url)
+    return sheets
+
+def index_rosters(jobs, frame):
+    """Given the jobs and a function returning the DataFrame of each sheet URL, returns the RosterIndex of every roster the homework jobs grade against (keyed by its version), and the version of each homework job's roster.
+    A student listed more than once on a roster is only indexed once, just as homeworkChecker.py does, so both tools share the same grading state and alias tables
+
+    >>> import pandas as pd
+    >>> from suitcase.grading import get_roster_version, grade_homework
+    >>> roster = pd.DataFrame({'Email': ['oski@berkeley.edu', 'kmishra9@berkeley.edu', 'oski@berkeley.edu']})
+    >>> rosters, roster_versions = index_rosters([HomeworkJob('a/homeworks', 'R', ['H'], 1), ClinicTourJob('a/clinic-tour-1', 'A', 'T')], lambda url: roster)
+    >>> rosters[roster_versions['a/homeworks']].emails, roster_versions['a/homeworks'] == get_roster_version(set(roster['Email']))
+    (['oski@berkeley.edu', 'kmishra9@berkeley.edu'], True)
+    >>> grade_homework(rosters[roster_versions['a/homeworks']], ['kmishra9@berkeley.edu', 'oski@berkeley.edu'])
+    []
+    """
+    from .grading import build_roster_index
+
+    rosters, roster_versions = dict(), dict()
+    for job in jobs:
+        if isinstance(job, HomeworkJob):
+            roster = build_roster_index(dict.fromkeys(frame(job.roster)['Email']))
+            roster_versions[job.name] = rosters.setdefault(roster.version, roster).version
+    return rosters, roster_versions
+
+def share_batch_inputs(emails, rosters, aliases, matching):
+    """Runs once in every run_batch worker, keeping the emails of every sheet, the index of every roster, the alias table of every roster and the matching options (assignment and cutoff) it was handed for each reconciliation it runs"""
+    global shared_batch_inputs
+    shared_batch_inputs = emails, rosters, aliases, matching
+
+def run_reconciliation(reconciliation):
+    """Runs one reconciliation inside a run_batch worker -- ('grade', roster version, homework URL, state path) grades a homework against a roster, and ('match', applications URL, attendees URL) finds the applicants who didn't attend.
+    Returns its missing students, what it printed, the (updated) alias table of its roster (None for a match) and the events it recorded"""
+    from .grading import grade_homework
+    from .matcher import find_fuzzy_matches
+
+    emails, rosters, aliases, matching = shared_batch_inputs
+    kind, *sheets            = reconciliation
+    learned_aliases          = None
+
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output), instrument.collect() as events:
+        if kind == 'grade':
+            roster_version, url, state_path = sheets
+            learned_aliases     = dict(aliases[roster_version])
+            missing_submissions = grade_homework(rosters[roster_version], emails[url], state_path, learned_aliases, processes=1, **matching)
+        else:
+            applications_url, attendees_url = sheets
+            missing_submissions = find_fuzzy_matches(list(dict.fromkeys(emails[applications_url])), list(dict.fromkeys(emails[attendees_url])), processes=1, **matching)
+    return missing_submissions, output.getvalue(), learned_aliases, events
+
+def run_batch(jobs, output_dir, loader_options=None, state_dir=GRADING_STATE_DIR, alias_dir=ALIAS_TABLE_DIR, regrade=False, streak=3, processes=None, assignment=False, cutoff=80):
+    """Runs every job (see get_jobs), writing each one's results to its own directory under output_dir, and returns the (name, directory, number of students missing something) of every job.
+
+    Every sheet is loaded once (loader_options are passed through to load_data_into_frames), every distinct reconciliation the jobs need is run once, on a pool of processes=None (every core) workers, and what each one printed goes into the report.txt of every job that needed it.
+    A homework job also writes students_without_submissions.txt, missed_homeworks.csv and missing_submissions.npz (as homeworkChecker.py does), and a clinic tour job students_without_submissions.txt (as clinicTourChecker.py does).
+    Homeworks keep their grading state in state_dir and the typos resolved for each roster in alias_dir, just as homeworkChecker.py does -- a homework graded against more than one roster keeps a state for each roster, in a directory named after it.
+    assignment and cutoff are passed through to find_fuzzy_matches, for homeworks and clinic tours alike
+    """
+    from .loader import load_data_into_frames
+    from .grading import get_state_path, load_aliases, save_aliases
+    from .report import build_missing_matrix, save_missing_matrix, get_missed_homeworks, report_missing_homeworks
+
+    #Every sheet is loaded once, however many jobs (or URLs) share it
+    sheets = get_sheets(jobs)
+    urls   = list(dict.fromkeys(sheets.values()))
+    frames = dict( zip(urls, load_data_into_frames(urls, **(loader_options or dict()))) )
+    frame  = lambda url: frames[sheets[url]]
+
+    for job in jobs:
+        if isinstance(job, HomeworkJob):
+            columns = ["Name", "Email", "UGSI"]
+            assert all(column in frame(job.roster).columns for column in columns), "Structure of the Roster File of " + job.name + " is incorrect -- need the following columns:\n\t" + str(columns)
+        else:
+            for url in (job.applications, job.attendees):
+                assert "Name" in frame(url).columns, "The input file given for " + job.name + " did not have the correct structure -- it needs (at least) an 'Email' and 'Name' column but these were the columns given: " + str(frame(url).columns.values.tolist())
+
+    #Planning the reconciliations each job needs -- jobs that share a roster (or the same pair of clinic tour sheets) share them too
+    rosters, roster_versions = index_rosters(jobs, frame)
+
+    #A homework's state only holds one roster's grading, so a homework graded against more than one roster keeps a state for each of them
+    graders    = Counter( url for _, url in { (roster_versions[job.name], sheets[url]) for job in jobs if isinstance(job, HomeworkJob) for url in job.homeworks } )
+    state_path = lambda roster_version, url: get_state_path(state_dir if graders[url] == 1 else os.path.join(state_dir, roster_version), url)
+
+    job_reconciliations = dict()
+    for job in jobs:
+        if isinstance(job, HomeworkJob):
+            roster_version                = roster_versions[job.name]
+            job_reconciliations[job.name] = [ ('grade', roster_version, sheets[url], state_path(roster_version, sheets[url])) for url in job.homeworks ]
+        else:
+            job_reconciliations[job.name] = [ ('match', sheets[job.applications], sheets[job.attendees]) ]
+    reconciliations = list( dict.fromkeys(reconciliation for planned in job_reconciliations.values() for reconciliation in planned) )
+
+    if regrade:
+        for reconciliation in reconciliations:
+            if reconciliation[0] == 'grade' and os.path.isfile(reconciliation[-1]):    os.remove(reconciliation[-1])
+
+    emails    = { url: frames[url]['Email'].tolist() for url in urls }
+    aliases   = { roster_version: load_aliases(alias_dir, roster_version) for roster_version in rosters }
+    matching  = dict(assignment=assignment, cutoff=cutoff)
+    processes = min(processes or os.cpu_count() or 1, len(reconciliations))
+
+    if processes <= 1:
+        share_batch_inputs(emails, rosters, aliases, matching)
+        results = [ run_reconciliation(reconciliation) for reconciliation in reconciliations ]
+    else:
+        #Each worker gets the sheets and rosters once, rather than once per reconciliation (forked workers inherit them without them ever being pickled)
+        with ProcessPoolExecutor(max_workers=processes, initializer=share_batch_inputs, initargs=(emails, rosters, aliases, matching)) as executor:
+            results = list( executor.map(run_reconciliation, reconciliations) )
+
+    missing, printed = dict(), dict()
+    for reconciliation, (missing_submissions, output, learned_aliases, events) in zip(reconciliations, results):
+        instrument.replay(events)
+        if learned_aliases is not None:     aliases[reconciliation[1]].update(learned_aliases)
+        missing[reconciliation], printed[reconciliation] = missing_submissions, output
+
+    for roster_version, roster_aliases in aliases.items():
+        save_aliases(alias_dir, roster_version, roster_aliases)
+
+    #Writing each job's results to its own directory, along with everything its reconciliations and reports printed
+    summary = []
+    for job in jobs:
+        directory = os.path.join(output_dir, job.name)
+        os.makedirs(directory, exist_ok=True)
+
+        report = io.StringIO()
+        report.write(''.join(printed[reconciliation] for reconciliation in job_reconciliations[job.name]))
+        with contextlib.redirect_stdout(report), instrument.stage('output', job=job.name) as counts:
+            if isinstance(job, HomeworkJob):
+                roster           = frame(job.roster)
+                homework_numbers = list( range(job.first_homework, job.first_homework + len(job.homeworks)) )
+                missing_matrix   = build_missing_matrix(roster['Email'], [missing[reconciliation] for reconciliation in job_reconciliations[job.name]])
+
+                output  = report_missing_homeworks(roster, missing_matrix, homework_numbers, streak)
+                results = get_missed_homeworks(roster, missing_matrix, homework_numbers)
+                results.to_csv( os.path.join(directory, 'missed_homeworks.csv'), index=False )
+                save_missing_matrix( os.path.join(directory, 'missing_submissions.npz'), roster, missing_matrix, homework_numbers )
+                counts.update(files=4, rows=len(output) + len(results))
+            else:
+                applications = frame(job.applications)
+                output       = applications[ applications['Email'].isin(missing[job_reconciliations[job.name][0]]) ]
+
+                cprint("========================================================================", 'blue')
+                print(output[["Name", "Email"]].head(len(output)))
+                cprint("========================================================================", 'blue')
+                counts.update(files=2, rows=len(output))
+
+            output.to_csv( os.path.join(directory, 'students_without_submissions.txt'), columns=["Email"], index=False, header=False )
+
+        with open(os.path.join(directory, 'report.txt'), 'w') as report_file:
+            report_file.write(report.getvalue())
+        summary.append( (job.name, directory, len(output)) )
+
+    return summary
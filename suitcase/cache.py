@@ -0,0 +1,92 @@
+"""
+Where the tools keep things between runs, and the on-disk cache of parsed sheets -- one metadata file and one snapshot per sheet, evicted least recently used first.
+"""
+
+import os
+import glob
+import json
+import hashlib
+import threading
+import importlib.util
+
+#Everything the tools cache between runs lives under here
+CACHE_ROOT = os.path.join(os.path.expanduser('~'), '.cache', 'suitcase')
+
+#Each homework's grading state is kept here between runs, so that only newly appended form responses need grading
+GRADING_STATE_DIR = os.path.join(CACHE_ROOT, 'homeworkChecker-grading')
+
+#Typos resolved for a roster are remembered here (one table per roster version), so they never need fuzzy scoring (or a warning) again
+ALIAS_TABLE_DIR = os.path.join(CACHE_ROOT, 'homeworkChecker-aliases')
+
+#Parsed sheets are kept here between runs (shared by every tool), and the least recently used ones are evicted once they take up more than SHEET_CACHE_MAX_BYTES
+SHEET_CACHE_DIR       = os.path.join(CACHE_ROOT, 'sheets')
+SHEET_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+#Snapshots are columnar (Feather) whenever pyarrow is installed
+SNAPSHOT_FORMAT = 'feather' if importlib.util.find_spec('pyarrow') else 'pickle'
+
+def get_cache_paths(cache_dir, export_url):
+    """Returns the (metadata, snapshot) paths the sheet exported from export_url is cached under"""
+    key = hashlib.sha1(export_url.encode()).hexdigest()
+    return os.path.join(cache_dir, key + '.json'), os.path.join(cache_dir, key + '.' + SNAPSHOT_FORMAT)
+
+def read_cache_entry(cache_dir, export_url):
+    """Returns the cached metadata (ETag, Last-Modified and content hash) of export_url, or None if it isn't cached"""
+    metadata_path, snapshot_path = get_cache_paths(cache_dir, export_url)
+    if not os.path.isfile(metadata_path) or not os.path.isfile(snapshot_path):
+        return None
+    
+    with open(metadata_path) as metadata_file:
+        return json.load(metadata_file)
+
+def read_snapshot(cache_dir, export_url):
+    """Loads the cached DataFrame of export_url and marks it as recently used"""
+    import pandas as pd
+
+    metadata_path, snapshot_path = get_cache_paths(cache_dir, export_url)
+    os.utime(metadata_path)
+    return getattr(pd, 'read_' + SNAPSHOT_FORMAT)(snapshot_path)
+
+def get_temp_path(path):
+    """Returns where a new version of path is written before being moved into place -- unique to this process and thread, so that tools (or threads) writing the same file at the same time never clobber each other's"""
+    return path + '.' + str(os.getpid()) + '.' + str(threading.get_ident()) + '.tmp'
+
+def write_cache_entry(cache_dir, export_url, df, metadata):
+    """Caches the DataFrame of export_url alongside its metadata -- both are written to temporary files first, so an interrupted run never leaves a half-written entry behind"""
+    os.makedirs(cache_dir, exist_ok=True)
+    metadata_path, snapshot_path = get_cache_paths(cache_dir, export_url)
+    
+    getattr(df, 'to_' + SNAPSHOT_FORMAT)(get_temp_path(snapshot_path))
+    os.replace(get_temp_path(snapshot_path), snapshot_path)
+    
+    with open(get_temp_path(metadata_path), 'w') as metadata_file:
+        json.dump(metadata, metadata_file)
+    os.replace(get_temp_path(metadata_path), metadata_path)
+
+def evict_cache(cache_dir, max_bytes=SHEET_CACHE_MAX_BYTES):
+    """Deletes the least recently used cache entries until the cache takes up at most max_bytes
+
+    >>> import tempfile
+    >>> import pandas as pd
+    >>> cache_dir = tempfile.mkdtemp()
+    >>> for day, export_url in enumerate(['hw1', 'hw2', 'hw3']):
+    ...     write_cache_entry(cache_dir, export_url, pd.DataFrame({'Email': ['oski@berkeley.edu'] * 100}), {'url': export_url})
+    ...     os.utime(get_cache_paths(cache_dir, export_url)[0], (day * 86400, day * 86400))
+    >>> _ = read_snapshot(cache_dir, 'hw1')        #Reading hw1 back leaves hw2 as the least recently used
+    >>> evict_cache(cache_dir, 2 * sum(os.path.getsize(path) for path in get_cache_paths(cache_dir, 'hw3')))
+    >>> [read_cache_entry(cache_dir, export_url) is not None for export_url in ['hw1', 'hw2', 'hw3']]
+    [True, False, True]
+    """
+    entries = []
+    for metadata_path in glob.glob(os.path.join(cache_dir, '*.json')):
+        snapshot_path = metadata_path[:-len('.json')] + '.' + SNAPSHOT_FORMAT
+        size          = sum(os.path.getsize(path) for path in (metadata_path, snapshot_path) if os.path.isfile(path))
+        entries.append( (os.path.getmtime(metadata_path), size, metadata_path, snapshot_path) )
+    
+    total_size = sum(size for _, size, _, _ in entries)
+    for _, size, metadata_path, snapshot_path in sorted(entries):
+        if total_size <= max_bytes: break
+        
+        for path in (metadata_path, snapshot_path):
+            if os.path.isfile(path):    os.remove(path)
+        total_size -= size
@@ -0,0 +1,59 @@
+"""
+The command line options the tools share -- loading (and caching) sheets, where grading state and alias tables are kept, how typos are matched, and instrumentation -- along with turning them into what the rest of the package takes.
+
+Only the standard library is imported here, so that --help never waits on numpy or pandas.
+"""
+
+import sys
+
+from . import instrument
+from .cache import SHEET_CACHE_DIR, SHEET_CACHE_MAX_BYTES, GRADING_STATE_DIR, ALIAS_TABLE_DIR
+
+def add_loader_arguments(parser):
+    """Adds the options for loading sheets (see get_loader_options) -- every tool caches them in the same SHEET_CACHE_DIR by default, so a sheet one tool loaded is never downloaded (or parsed) again by another"""
+    parser.add_argument('--offline',    action='store_true',                                    help="only use sheets cached by earlier runs -- nothing is downloaded")
+    parser.add_argument('--cache-dir',  default=SHEET_CACHE_DIR,                                help="where downloaded sheets are cached between runs (default: %(default)s)")
+    parser.add_argument('--cache-size', default=SHEET_CACHE_MAX_BYTES // 2**20, type=int, metavar='MEGABYTES', help="how many megabytes of cached sheets to keep (default: %(default)s)")
+    parser.add_argument('--no-cache',   action='store_true',                                    help="always download and parse every sheet from scratch")
+    parser.add_argument('--chunk-size', default=None, type=int, metavar='ROWS',                 help="parse each sheet this many rows at a time, to keep memory flat for very large sheets")
+
+def get_loader_options(args):
+    """Returns the keyword arguments of load_data_into_frames asked for by the options add_loader_arguments added
+
+    >>> import argparse
+    >>> parser = argparse.ArgumentParser()
+    >>> add_loader_arguments(parser)
+    >>> get_loader_options(parser.parse_args(['--cache-dir', 'sheets', '--cache-size', '1', '--chunk-size', '100']))
+    {'cache_dir': 'sheets', 'offline': False, 'cache_max_bytes': 1048576, 'chunksize': 100}
+    >>> get_loader_options(parser.parse_args(['--no-cache']))['cache_dir'] is None
+    True
+    """
+    return dict(cache_dir=None if args.no_cache else args.cache_dir, offline=args.offline, cache_max_bytes=args.cache_size * 2**20, chunksize=args.chunk_size)
+
+def add_grading_arguments(parser):
+    """Adds the options for where each homework's grading state and each roster's alias table are kept"""
+    parser.add_argument('--state-dir',  default=GRADING_STATE_DIR,                              help="where each homework's grading state is kept between runs, so only new responses get graded (default: %(default)s)")
+    parser.add_argument('--alias-dir',  default=ALIAS_TABLE_DIR,                                help="where the typos resolved for each roster are remembered between runs (default: %(default)s)")
+
+def add_matching_arguments(parser):
+    """Adds the options for how typos are resolved (see find_fuzzy_matches)"""
+    parser.add_argument('--assignment', action='store_true',                                    help="resolve typos with a one-to-one assignment between the students and submissions left unmatched, instead of greedily")
+    parser.add_argument('--cutoff',     default=80, type=int, metavar='N',                      help="how similar (out of 100) a typo has to be to its student's email to be resolved instead of flagged (default: %(default)s)")
+
+def add_instrument_arguments(parser, profiled="profile the matcher with cProfile"):
+    """Adds the options for recording stage timings and counters, and for profiling (see start_recording) -- profiled describes what --profile does"""
+    parser.add_argument('--stats',      default=None, metavar='PATH',                           help="write how long each stage of the run took, and what it counted, to PATH as JSON lines ('-' for stderr)")
+    parser.add_argument('--stats-summary', action='store_true',                                 help="print a table of how long each stage of the run took, and what it counted, at the end")
+    parser.add_argument('--profile',    default=None, metavar='PATH',                           help=profiled + ", saving the profile to PATH")
+
+def start_recording(args):
+    """Starts recording as asked for by the options add_instrument_arguments added, writing every event to --stats (see finish_recording)"""
+    stats_file = sys.stderr if args.stats == '-' else open(args.stats, 'a') if args.stats else None
+    if stats_file or args.stats_summary or args.profile:
+        instrument.enable(stats_file, profile=bool(args.profile))
+
+def finish_recording(args):
+    """Prints the --stats-summary, saves the --profile and closes the --stats file of a run started with start_recording"""
+    if args.stats_summary:  instrument.summarize()
+    if args.profile:        instrument.save_profile(args.profile)
+    if args.stats and args.stats != '-':    instrument.stream.close()
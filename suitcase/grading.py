@@ -0,0 +1,194 @@
+"""
+Grades homeworks against the class roster -- each homework's grading state is kept between runs so that only newly appended form responses need grading, and every typo resolved for a roster is remembered in its alias table.
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import hashlib
+import itertools
+import contextlib
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from termcolor import colored
+
+from . import instrument
+from .cache import get_temp_path
+from .loader import get_export_url
+from .matcher import normalize_email, find_fuzzy_matches
+
+def get_fingerprint(emails):
+    """Given an array of emails, returns a hash that changes whenever any of them (or their order) does
+    
+    >>> get_fingerprint(['oski@berkeley.edu', float('nan')]) == get_fingerprint(['oski@berkeley.edu', float('nan')])
+    True
+    >>> get_fingerprint(['oski@berkeley.edu']) == get_fingerprint(['oski@berkeley.edu', 'rando@berkeley'])
+    False
+    """
+    return hashlib.sha1( '\n'.join(str(email) for email in emails).encode() ).hexdigest()
+
+def get_roster_version(all_emails):
+    """Given the roster's emails, returns a fingerprint that changes whenever the roster does (but not when it is just reordered)
+    
+    >>> get_roster_version({'oski@berkeley.edu', 'kmishra9@berkeley.edu'}) == get_roster_version(['kmishra9@berkeley.edu', 'oski@berkeley.edu'])
+    True
+    """
+    return get_fingerprint(sorted(email for email in all_emails if type(email) == str))
+
+#The roster side of matching -- sanitized, normalized and fingerprinted once, then shared (read-only) by every homework
+RosterIndex = namedtuple('RosterIndex', ['emails', 'keys', 'version'])
+
+def build_roster_index(all_emails):
+    """Given the roster's emails, returns its RosterIndex
+    
+    >>> build_roster_index(['Oski@berkeley.edu', float('nan')]).keys
+    ['oski']
+    """
+    emails = [email for email in all_emails if type(email) == str]
+    return RosterIndex(emails, [normalize_email(email) for email in emails], get_roster_version(emails))
+
+def get_state_path(state_dir, url):
+    """Returns the path the grading state of the homework sheet at url is saved under"""
+    return os.path.join(state_dir, hashlib.sha1(get_export_url(url).encode()).hexdigest() + '.json')
+
+def grade_homework(all_emails, submission_emails, state_path=None, aliases=None, confirm=None, processes=None, assignment=False, cutoff=80):
+    """Given the roster's emails (or its RosterIndex) and a homework's submission emails (one per form response, in sheet order), returns the roster emails that did not submit.
+    
+    With a state_path, the rows seen, matches and missing students of the previous run are read from (and written back to) that file, and only the responses appended since then go through find_fuzzy_matches.
+    Any other change to the sheet, any change to the roster, or grading with another assignment or cutoff means a full regrade
+    
+    aliases, confirm, processes, assignment and cutoff are passed through to find_fuzzy_matches, and every typo resolved along the way is added to aliases (see learn_aliases)
+    """
+    started           = time.perf_counter()
+    roster            = all_emails if isinstance(all_emails, RosterIndex) else build_roster_index(all_emails)
+    submission_emails = list(submission_emails)
+    roster_version    = roster.version
+    
+    state = None
+    if state_path and os.path.isfile(state_path):
+        with open(state_path) as state_file:
+            state = json.load(state_file)
+    
+    matching    = [assignment, cutoff]
+    incremental = bool(state) and state['roster'] == roster_version and state.get('matching', [False, 80]) == matching and state['rows_seen'] <= len(submission_emails) and state['rows_fingerprint'] == get_fingerprint(submission_emails[:state['rows_seen']])
+    if incremental:
+        #Responses from students who were already matched are just resubmissions
+        submitted_keys  = { normalize_email(email) for email in itertools.chain(state['matches'], state['matches'].values()) }
+        new_submissions = [ email for email in dict.fromkeys(submission_emails[state['rows_seen']:]) if type(email) == str and normalize_email(email) not in submitted_keys ]
+        
+        #Only the students still missing can be matched to the new responses (or to older ones nobody could claim)
+        submissions                 = state['unmatched'] + new_submissions
+        missing_submissions, matches = find_fuzzy_matches(state['missing'], submissions, processes, assignment, cutoff, return_matches=True, aliases=aliases, confirm=confirm) if new_submissions else (state['missing'], dict())
+        matches                     = { **state['matches'], **matches }
+    else:
+        submissions                 = [ email for email in dict.fromkeys(submission_emails) if type(email) == str ]
+        missing_submissions, matches = find_fuzzy_matches(roster.emails, submissions, processes, assignment, cutoff, return_matches=True, aliases=aliases, confirm=confirm, all_keys=roster.keys)
+    
+    if aliases is not None:
+        learn_aliases(aliases, matches)
+    
+    if state_path:
+        matched_submissions = set(matches.values())
+        state = {
+            'roster':           roster_version,
+            'matching':         matching,
+            'rows_seen':        len(submission_emails),
+            'rows_fingerprint': get_fingerprint(submission_emails),
+            'matches':          matches,
+            'missing':          missing_submissions,
+            'unmatched':        [ email for email in submissions if email.split('@')[0] not in matched_submissions ],
+        }
+        
+        os.makedirs(os.path.dirname(state_path), exist_ok=True)
+        with open(get_temp_path(state_path), 'w') as state_file:
+            json.dump(state, state_file)
+        os.replace(get_temp_path(state_path), state_path)
+    
+    instrument.record('grade', time.perf_counter() - started, rows=len(submission_emails), graded=len(new_submissions) if incremental else len(submissions), incremental=incremental,
+                      missing=len(missing_submissions))
+    return missing_submissions
+
+def share_grading_inputs(roster, aliases, matching):
+    """Runs once in every grade_homeworks worker, keeping the roster index, alias table and matching options (assignment and cutoff) it was handed for each homework it grades"""
+    global shared_grading_inputs
+    shared_grading_inputs = roster, aliases, matching
+
+def grade_homework_in_worker(submission_emails, state_path):
+    """Grades one homework inside a grade_homeworks worker, against the roster index, alias table and matching options it was handed, and returns its missing students, what it printed, its (updated) alias table and the events it recorded"""
+    roster, aliases, matching = shared_grading_inputs
+    aliases         = None if aliases is None else dict(aliases)
+    
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output), instrument.collect() as events:
+        missing_submissions = grade_homework(roster, submission_emails, state_path, aliases, processes=1, **matching)
+    return missing_submissions, output.getvalue(), aliases, events
+
+def grade_homeworks(all_emails, all_submission_emails, state_paths, aliases=None, confirm=None, processes=None, assignment=False, cutoff=80):
+    """Given the roster's emails (or its RosterIndex), the submission emails of every homework and where each homework's state is kept (see grade_homework), grades all of the homeworks at the same time and returns their missing students in the same order.
+    The roster is indexed once and handed to each of a pool of processes=None (every core) workers when it starts, and whatever they print or learn is merged back in homework order -- confirming flagged emails needs the terminal, so it grades one homework at a time.
+    assignment and cutoff are passed through to find_fuzzy_matches, and ties between typos go to the student who comes first on the roster -- so pass it in roster order (e.g. dict.fromkeys of its emails), never as a set
+    
+    >>> grade_homeworks(['abcdef1@x.edu', 'abcdef2@x.edu', 'oski@x.edu'], [['abcdef@x.edu', 'oski@x.edu']], [None])
+    [['abcdef2@x.edu']]
+    >>> roster = ['kunalmishra9@gmail.com', 'kmishra9@berkeley.edu', 'oski@berkeley.edu']
+    >>> grade_homeworks(roster, [['kunalmishr9@gmail.com', 'kmishra9@berkeley.edu', 'oski@berkeley.edu']], [None], assignment=True)
+    [[]]
+    >>> grade_homeworks(roster, [['kunalmishr9@gmail.com', 'kmishra9@berkeley.edu', 'oski@berkeley.edu']], [None], assignment=True, cutoff=99)
+    **********
+    Please check on kunalmishra9@gmail.com. The most similar email we found in the submissions was kunalmishr9@gmail.com with a similarity score of 96 out of 100. 
+    **********
+    [['kunalmishra9@gmail.com']]
+    """
+    roster    = all_emails if isinstance(all_emails, RosterIndex) else build_roster_index(all_emails)
+    jobs      = [ (list(submission_emails), state_path) for submission_emails, state_path in zip(all_submission_emails, state_paths) ]
+    processes = min(processes or os.cpu_count() or 1, len(jobs))
+    
+    if confirm is not None or processes <= 1:
+        return [ grade_homework(roster, submission_emails, state_path, aliases, confirm, assignment=assignment, cutoff=cutoff) for submission_emails, state_path in jobs ]
+    
+    #Each worker gets the index once, rather than once per homework (forked workers inherit it without it ever being pickled)
+    with ProcessPoolExecutor(max_workers=processes, initializer=share_grading_inputs, initargs=(roster, aliases, dict(assignment=assignment, cutoff=cutoff))) as executor:
+        results = list( executor.map(grade_homework_in_worker, *zip(*jobs)) )
+    
+    students_without_submissions = []
+    for missing_submissions, output, learned_aliases, events in results:
+        sys.stdout.write(output)
+        instrument.replay(events)
+        if aliases is not None:     aliases.update(learned_aliases)
+        students_without_submissions.append(missing_submissions)
+    return students_without_submissions
+
+def load_aliases(alias_dir, roster_version):
+    """Returns the alias table (normalized submission email -> roster email) learned for this version of the roster, which is empty for a roster that changed"""
+    path = os.path.join(alias_dir, roster_version + '.json')
+    if not os.path.isfile(path):
+        return dict()
+    
+    with open(path) as alias_file:
+        return json.load(alias_file)
+
+def save_aliases(alias_dir, roster_version, aliases):
+    os.makedirs(alias_dir, exist_ok=True)
+    path = os.path.join(alias_dir, roster_version + '.json')
+    
+    with open(get_temp_path(path), 'w') as alias_file:
+        json.dump(aliases, alias_file, indent=4, sort_keys=True)
+    os.replace(get_temp_path(path), path)
+
+def learn_aliases(aliases, matches):
+    """Given the matches returned by find_fuzzy_matches, adds every one that wasn't exact (i.e. every resolved typo) to aliases
+    
+    >>> aliases = dict()
+    >>> learn_aliases(aliases, {'kunalmishra9@gmail.com': 'kunalmishr9', 'oski@berkeley.edu': 'oski'})
+    >>> aliases
+    {'kunalmishr9': 'kunalmishra9@gmail.com'}
+    """
+    for email, submission in matches.items():
+        if normalize_email(submission) != normalize_email(email):   aliases[normalize_email(submission)] = email
+
+def ask_to_confirm(email, most_similar_email, score):
+    """Asks the user whether the flagged submission most_similar_email was actually made by (the student with) email"""
+    answer = input("Was " + colored(most_similar_email, 'green') + " submitted by " + colored(email, 'green') + "? [y/N]\n")
+    return answer.strip().lower() in ('y', 'yes')
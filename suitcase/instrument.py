@@ -0,0 +1,116 @@
+"""
+Opt-in instrumentation -- how long each stage of a run took and what it did (bytes and rows loaded, exact matches, candidates scored, emails flagged...), written out as JSON lines and/or summed up in a table, plus a cProfile hook for the matcher.
+
+Nothing is recorded until enable() is called, and until then recording an event is a single check.
+"""
+
+import sys
+import json
+import time
+import pstats
+import cProfile
+import threading
+import contextlib
+from collections import OrderedDict
+
+#The events recorded so far (None while disabled), the file object each one is also written to as a JSON line, and the matcher's profile (None unless profiling)
+events   = None
+stream   = None
+profiler = None
+lock     = threading.Lock()
+
+def enable(output=None, profile=False):
+    """Starts recording events -- each one is also written to the output file object as a JSON line, if given. With profile=True, every profiling() block is profiled too"""
+    global events, stream, profiler
+    events, stream = [], output
+    if profile:     profiler = cProfile.Profile()
+
+def disable():
+    """Stops recording (and profiling), and forgets every event recorded so far"""
+    global events, stream, profiler
+    events, stream, profiler = None, None, None
+
+def record(stage, seconds, **counts):
+    """Records that stage took seconds, along with whatever it counted"""
+    if events is None:  return
+
+    event = OrderedDict(stage=stage, seconds=round(seconds, 6), **counts)
+    with lock:
+        events.append(event)
+        if stream is not None:
+            stream.write(json.dumps(event) + '\n')
+            stream.flush()
+
+@contextlib.contextmanager
+def stage(name, **counts):
+    """Records the block as stage name -- the dict it yields (starting out as counts) can be filled in with whatever the block counts along the way
+
+    >>> with collect() as collected:
+    ...     with stage('output', files=1) as counts:
+    ...         counts['rows'] = 3
+    >>> [ (event['stage'], event['files'], event['rows']) for event in collected ]
+    [('output', 1, 3)]
+    """
+    counts  = OrderedDict(counts)
+    started = time.perf_counter()
+    yield counts
+    record(name, time.perf_counter() - started, **counts)
+
+@contextlib.contextmanager
+def collect():
+    """Records the block's events into the list it yields (whether or not instrumentation is enabled) instead of writing them out -- for worker processes, which hand them back to be replayed"""
+    global events, stream
+    saved          = events, stream
+    events, stream = [], None
+    try:
+        yield events
+    finally:
+        events, stream = saved
+
+def replay(collected):
+    """Records the events collected (see collect) in another process"""
+    for event in collected:
+        record(**event)
+
+@contextlib.contextmanager
+def profiling():
+    """Profiles the block, if profiling was enabled -- every block adds to the same profile"""
+    if profiler is None:
+        yield
+        return
+
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+
+def summarize(file=sys.stderr):
+    """Prints how many times each stage ran, how long it took in total and everything it counted (summed)
+
+    >>> enable()
+    >>> record('load', 0.5, rows=10, source='download'); record('load', 0.25, rows=5, source='not modified')
+    >>> summarize(sys.stdout)
+    stage        calls    seconds  counts
+    load             2      0.750  rows=15
+    >>> disable()
+    """
+    totals = OrderedDict()
+    for event in events or []:
+        total = totals.setdefault(event['stage'], OrderedDict(calls=0, seconds=0.0, counts=OrderedDict()))
+        total['calls']   += 1
+        total['seconds'] += event['seconds']
+        for name, value in event.items():
+            #Only numbers add up -- urls, sources and flags don't
+            if name not in ('stage', 'seconds') and type(value) in (int, float):   total['counts'][name] = total['counts'].get(name, 0) + value
+
+    print("{:<10} {:>7} {:>10}  {}".format('stage', 'calls', 'seconds', 'counts'), file=file)
+    for name, total in totals.items():
+        print("{:<10} {:>7} {:>10.3f}  {}".format(name, total['calls'], total['seconds'], ', '.join(count + '=' + str(round(value, 3) if type(value) == float else value) for count, value in total['counts'].items())), file=file)
+
+def save_profile(path, limit=20, file=sys.stderr):
+    """Saves the profile taken by every profiling() block to path (for pstats or snakeviz), and prints its limit most expensive calls"""
+    if profiler is None:    return
+
+    profiler.dump_stats(path)
+    pstats.Stats(path, stream=file).sort_stats('cumulative').print_stats(limit)
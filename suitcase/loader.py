@@ -0,0 +1,182 @@
+"""
+Loads Google Sheets into pandas DataFrames -- every sheet is downloaded concurrently over one keep-alive session, and parsed sheets are cached on disk between runs.
+
+pandas and requests are only imported once a sheet actually needs to be downloaded or read back from the cache.
+"""
+
+import io
+import time
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from termcolor import cprint
+
+from . import instrument
+from .cache import SHEET_CACHE_DIR, SHEET_CACHE_MAX_BYTES, read_cache_entry, read_snapshot, write_cache_entry, evict_cache
+
+#Bounds how many sheets are downloaded (and parsed) at once
+LOADER_MAX_WORKERS = 8
+
+def get_export_url(url):
+    """Given the URL of a Google Sheet (as copied from the URL bar), returns the URL that exports that sheet as a CSV
+    
+    >>> get_export_url('https://docs.google.com/spreadsheets/d/1dfNlANsLDBeqmFl-hD4bBg_gYhxK3KzBEf-ZEP5ENS0/edit#gid=1958005464')
+    'https://docs.google.com/spreadsheets/d/1dfNlANsLDBeqmFl-hD4bBg_gYhxK3KzBEf-ZEP5ENS0/export?gid=1958005464&format=csv'
+    """
+    #Doing some URL reformatting
+    separated       = url.split(sep='/')
+    gid             = separated[-1].split(sep='gid=')[-1]
+    separated[-1]    = 'export?gid=' + gid + '&format=csv'
+    reconstructed_url = '/'.join(separated)
+    return reconstructed_url
+
+def create_session(max_workers=LOADER_MAX_WORKERS, retries=3, backoff=0.5):
+    """Returns a requests Session whose keep-alive connections are shared by up to max_workers threads, and that retries failed downloads with exponential backoff"""
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    retry   = Retry(total=retries, backoff_factor=backoff, status_forcelist=(429, 500, 502, 503, 504), allowed_methods=('GET',))
+    adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers, max_retries=retry)
+    
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+#Every column the tools read, and the headers each one goes by in the exported sheets (the first one found wins) -- no other column is ever parsed
+SHEET_COLUMNS = {
+    'Email':        ['Email Address', 'Email'],
+    'Name':         ['Name'],
+    'First Name':   ['First Name', 'First name'],
+    'Last Name':    ['Last Name', 'Last name'],
+    'UGSI':         ['UGSI'],
+}
+
+def resolve_headers(headers):
+    """Given a sheet's headers, returns the ones the tools read, mapped to the column each one becomes
+    
+    >>> resolve_headers(['Timestamp', 'Email Address', 'First name', 'Last name', 'Question 1'])
+    {'Email Address': 'Email', 'First name': 'First Name', 'Last name': 'Last Name'}
+    """
+    headers = list(headers)
+    assert any(header in headers for header in SHEET_COLUMNS['Email']), "The input file given did not have the correct structure -- it needs (at least) an 'Email' column but these were the columns given: " + str(headers)
+    
+    renames = dict()
+    for column, aliases in SHEET_COLUMNS.items():
+        found = [header for header in aliases if header in headers]
+        if found:   renames[found[0]] = column
+    return renames
+
+def normalize_frame(df):
+    """Given a parsed sheet (or a chunk of one), keeps only the 'Email', 'Name' and 'UGSI' columns the tools rely on -- a 'Name' is built from the first and last names whenever the sheet has both
+    
+    >>> import pandas as pd
+    >>> df = pd.DataFrame({'Timestamp': [1, 2], 'Email Address': ['oski@berkeley.edu', 'kmishra9@berkeley.edu'], 'First name': ['Oski', 'Kunal'], 'Last name': ['Bear', float('nan')]})
+    >>> normalize_frame(df)
+                       Email      Name
+    0      oski@berkeley.edu  OskiBear
+    1  kmishra9@berkeley.edu     Kunal
+    """
+    assert df is not None, "Data did not load!"
+    
+    renames = resolve_headers(df.columns)
+    df      = df[list(renames)].rename(columns=renames)
+    
+    if "First Name" in df.columns and "Last Name" in df.columns:
+        df = df.assign(Name=df["First Name"].str.cat(df["Last Name"], na_rep=''))
+    return df.drop(columns=["First Name", "Last Name"], errors='ignore')
+
+def read_sheet(content, chunksize=None):
+    """Given the bytes of an exported sheet, parses (as strings) only the columns the tools read and returns its normalized DataFrame (see normalize_frame), with the UGSI column as a categorical.
+    With a chunksize, the sheet is parsed and normalized that many rows at a time, so none of the columns that get dropped is ever held for the whole sheet at once
+    
+    >>> df = read_sheet(b'Timestamp,Email Address,UGSI,Answer\\n1,oski@berkeley.edu,Alice,x\\n2,kmishra9@berkeley.edu,Bob,y\\n', chunksize=1)
+    >>> df.columns.tolist(), df['UGSI'].cat.categories.tolist()
+    (['Email', 'UGSI'], ['Alice', 'Bob'])
+    """
+    import pandas as pd
+
+    renames = resolve_headers( pd.read_csv(io.BytesIO(content), nrows=0).columns )
+    options = dict(usecols=list(renames), dtype=str)
+    
+    if chunksize is None:   df = normalize_frame( pd.read_csv(io.BytesIO(content), **options) )
+    else:                   df = pd.concat([ normalize_frame(chunk) for chunk in pd.read_csv(io.BytesIO(content), chunksize=chunksize, **options) ], ignore_index=True)
+    
+    if "UGSI" in df.columns:
+        df["UGSI"] = df["UGSI"].astype('category')
+    return df
+
+def fetch_frame(session, url, cache_dir=SHEET_CACHE_DIR, offline=False, chunksize=None):
+    """Given a session and the URL of a Google Sheet, returns its normalized DataFrame -- from the cache in cache_dir when the sheet hasn't changed since it was cached (or always, when offline), and freshly downloaded and parsed otherwise.
+    A cache_dir of None disables caching, and chunksize is passed through to read_sheet"""
+    export_url = get_export_url(url)
+    
+    with instrument.stage('load', url=url) as counts:
+        entry = read_cache_entry(cache_dir, export_url) if cache_dir else None
+        
+        if offline:
+            assert entry is not None, "Running offline, but " + url + " has never been loaded (and cached) before"
+            counts['source'] = 'offline'
+            df = read_snapshot(cache_dir, export_url)
+            counts['rows'] = len(df)
+            return df
+        
+        #Revalidating the cached copy -- the server answers 304 if the sheet hasn't changed since
+        headers = dict()
+        if entry and entry['etag']:             headers['If-None-Match']     = entry['etag']
+        if entry and entry['last_modified']:    headers['If-Modified-Since'] = entry['last_modified']
+        
+        started  = time.perf_counter()
+        response = session.get(export_url, headers=headers, timeout=30)
+        counts['download_seconds'] = round(time.perf_counter() - started, 6)
+        counts['bytes']            = len(response.content)
+        
+        if response.status_code == 304 and entry:
+            counts['source'] = 'not modified'
+            df = read_snapshot(cache_dir, export_url)
+            counts['rows'] = len(df)
+            return df
+        response.raise_for_status()
+        
+        #Servers that don't send validators still spare us the parsing when the export is byte-for-byte unchanged
+        digest = hashlib.sha1(response.content).hexdigest()
+        if entry and entry['sha1'] == digest:
+            counts['source'] = 'unchanged'
+            df = read_snapshot(cache_dir, export_url)
+            counts['rows'] = len(df)
+            return df
+        
+        started = time.perf_counter()
+        df      = read_sheet(response.content, chunksize)
+        counts.update(source='download', rows=len(df), parse_seconds=round(time.perf_counter() - started, 6))
+        
+        if cache_dir:
+            metadata = {'url': export_url, 'etag': response.headers.get('ETag'), 'last_modified': response.headers.get('Last-Modified'), 'sha1': digest}
+            try:
+                write_cache_entry(cache_dir, export_url, df, metadata)
+            #Caching is best-effort -- e.g. pyarrow refuses columns that mix numbers and text
+            except (OSError, ValueError, TypeError):
+                pass
+        return df
+
+def load_data_into_frames(urls, max_workers=LOADER_MAX_WORKERS, retries=3, backoff=0.5, cache_dir=SHEET_CACHE_DIR, offline=False, cache_max_bytes=SHEET_CACHE_MAX_BYTES, chunksize=None):
+    """Given an array of Google Sheet URLs, fetches all of them concurrently over one shared keep-alive session (see fetch_frame), and returns their DataFrames in the same order (a sheet given twice, even by two different URLs, is only fetched once)"""
+    first_urls = dict()
+    for url in urls:    first_urls.setdefault(get_export_url(url), url)
+    unique_urls = list(first_urls.values())
+    
+    with create_session(max_workers, retries, backoff) as session, ThreadPoolExecutor(max_workers=max_workers) as executor:
+        frames = list( executor.map(lambda url: fetch_frame(session, url, cache_dir, offline, chunksize), unique_urls) )
+    
+    if cache_dir and not offline:
+        evict_cache(cache_dir, cache_max_bytes)
+    
+    for _ in frames:
+        cprint(".\n..\n...\nSuccess -- loading complete!\n", 'green')
+    
+    frames = dict(zip(first_urls, frames))
+    return [frames[get_export_url(url)] for url in urls]
+
+def load_data_into_frame(url):
+    """Given the URL of a Google Sheet, returns its normalized DataFrame (see load_data_into_frames)"""
+    return load_data_into_frames([url])[0]
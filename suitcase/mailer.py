@@ -0,0 +1,176 @@
+"""
+Sends reminder emails -- rendered from string templates, sent over a few rate-limited SMTP connections at once, and recorded in an append-only journal so that resuming a run never emails anyone twice.
+"""
+
+import os
+import csv
+import time
+import queue
+import smtplib
+import threading
+from string import Template
+
+#Example email body: https://docs.google.com/document/d/1ZIb9yZK-MxvVsqHYSn7jzIarDoOGT6oZ-0_9DRtYM4M/edit?usp=sharing
+REMINDER_SUBJECT = Template("[Action Required] HW$homework_number Submission Missing")
+REMINDER_BODY    = Template("Hey y'all,\n\n"
+                            "Just reaching out to let you know we didn't receive a HW$homework_number submission from you.\n\n"
+                            "If you think this is a mistake, please let us know. Otherwise, please complete last week's homework as soon as you can.\n\n"
+                            "$CD_initials")
+
+DIGEST_SUBJECT   = Template("[Action Required] $homeworks $Submissions Missing")
+DIGEST_BODY      = Template("Hey y'all,\n\n"
+                            "Just reaching out to let you know we haven't received your $homeworks $submissions yet.\n\n"
+                            "If you think this is a mistake, please let us know. Otherwise, please complete $them as soon as you can.\n\n"
+                            "$CD_initials")
+
+def get_recipients(path='students_without_submissions.txt'):
+    """Returns every email listed (one per line) in the file written by homeworkChecker.py"""
+    assert os.path.isfile(path), "Uh-oh... it looks like you don't have a file titled '" +path+ "'. Please make sure you run homeworkChecker.py first before using the Automated Email Reminder system."
+
+    with open(path, 'r') as recipients_file:
+        return [recipient.strip() for recipient in recipients_file.readlines() if recipient.strip()]
+
+def get_digest_recipients(path):
+    """Given the missed_homeworks.csv written by homeworkChecker.py, returns each student's email and the numbers of the homeworks they missed"""
+    assert os.path.isfile(path), "Uh-oh... it looks like you don't have a file titled '" +path+ "'. Please make sure you run homeworkChecker.py first before using the Automated Email Reminder system."
+
+    with open(path, 'r', newline='') as results_file:
+        return [ (row['Email'].strip(), row['Missed homeworks'].split()) for row in csv.DictReader(results_file) if row['Email'].strip() ]
+
+def format_homeworks(homework_numbers):
+    """
+    >>> format_homeworks(['3'])
+    'HW3'
+    >>> format_homeworks(['3', '5', '8'])
+    'HW3, HW5 and HW8'
+    """
+    homeworks = ['HW' + number for number in homework_numbers]
+    return homeworks[0] if len(homeworks) == 1 else ', '.join(homeworks[:-1]) + ' and ' + homeworks[-1]
+
+def render_digest(homework_numbers, CD_initials):
+    """Returns the subject and body of the one email covering every homework a student missed"""
+    submissions = 'submission' if len(homework_numbers) == 1 else 'submissions'
+    fields      = dict(homeworks=format_homeworks(homework_numbers), submissions=submissions, Submissions=submissions.capitalize(),
+                       them='it' if len(homework_numbers) == 1 else 'them', CD_initials=CD_initials)
+    return DIGEST_SUBJECT.substitute(fields), DIGEST_BODY.substitute(fields)
+
+class RateLimiter:
+    """Spaces out calls to wait() so that, across every thread sharing the limiter, they return at most rate times per second (a rate of 0 means no limit)"""
+
+    def __init__(self, rate):
+        self.interval  = 1.0 / rate if rate else 0.0
+        self.next_time = time.monotonic()
+        self.lock      = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now            = time.monotonic()
+            scheduled_time = max(self.next_time, now)
+            self.next_time = scheduled_time + self.interval
+        time.sleep(scheduled_time - now)
+
+def new_run():
+    """Returns a fresh id for this run's emails, so that the journal never mixes them up with an earlier run's"""
+    return time.strftime('%Y%m%dT%H%M%S') + '.' + str(os.getpid())
+
+def read_journal(path):
+    """Returns the status ('sending', 'sent' or 'failed') last recorded in the journal for every email, keyed by (run, subject, recipient), and the run recorded last (None for an empty journal)
+
+    >>> import os, tempfile, threading
+    >>> path = os.path.join(tempfile.mkdtemp(), 'sent_emails.journal')
+    >>> read_journal(path)
+    ({}, None)
+    >>> with open(path, 'a') as journal_file:
+    ...     append_to_journal(journal_file, threading.Lock(), 'sending', ('run1', 'HW3', 'oski@berkeley.edu'))
+    ...     append_to_journal(journal_file, threading.Lock(), 'sent',    ('run1', 'HW3', 'oski@berkeley.edu'))
+    ...     append_to_journal(journal_file, threading.Lock(), 'sending', ('run2', 'HW3', 'oski@berkeley.edu'))
+    ...     _ = journal_file.write('sent\trun2\tHW3')
+    >>> read_journal(path)
+    ({('run1', 'HW3', 'oski@berkeley.edu'): 'sent', ('run2', 'HW3', 'oski@berkeley.edu'): 'sending'}, 'run2')
+    """
+    statuses, last_run = dict(), None
+    if not os.path.isfile(path):
+        return statuses, last_run
+
+    with open(path, 'r') as journal_file:
+        for line in journal_file:
+            fields = line.rstrip('\n').split('\t')
+            #A line cut short by a crash is ignored
+            if len(fields) == 4:    statuses[ tuple(fields[1:]) ], last_run = fields[0], fields[1]
+    return statuses, last_run
+
+def append_to_journal(journal_file, journal_lock, status, key):
+    """Records the status of the email with this (run, subject, recipient) key, making sure it is on disk before returning"""
+    with journal_lock:
+        journal_file.write(status + '\t' + '\t'.join(key) + '\n')
+        journal_file.flush()
+        os.fsync(journal_file.fileno())
+
+def queue_emails(emails, statuses, resend_uncertain=False):
+    """Queues up the (key, message) pairs of emails for send_emails, skipping the ones statuses (see read_journal) says were sent -- or, unless resend_uncertain, may or may not have been -- and returns the queue along with the recipients of each kind skipped
+
+    >>> emails   = [ (('run1', 'HW3', recipient), None) for recipient in ['oski@berkeley.edu', 'kmishra9@berkeley.edu', 'ann@berkeley.edu'] ]
+    >>> statuses = {('run1', 'HW3', 'oski@berkeley.edu'): 'sent', ('run1', 'HW3', 'kmishra9@berkeley.edu'): 'sending'}
+    >>> pending, already, uncertain = queue_emails(emails, statuses)
+    >>> pending.qsize(), already, uncertain
+    (1, ['oski@berkeley.edu'], ['kmishra9@berkeley.edu'])
+    >>> queue_emails(emails, statuses, resend_uncertain=True)[0].qsize()
+    2
+    """
+    pending, already, uncertain = queue.Queue(), [], []
+    for key, msg in emails:
+        if statuses.get(key) == 'sent':                                 already.append(key[2])
+        elif statuses.get(key) == 'sending' and not resend_uncertain:   uncertain.append(key[2])
+        else:                                                           pending.put( (key, msg) )
+    return pending, already, uncertain
+
+def connect(args, credentials=None):
+    server = smtplib.SMTP(args.host, args.port, timeout=30)
+    server.ehlo()
+    if not args.no_tls:
+        server.starttls()
+        server.ehlo()
+    if not args.no_login:
+        server.login(*credentials)                                         #Fixes any login issues: https://accounts.google.com/DisplayUnlockCaptcha
+    return server
+
+def disconnect(server):
+    try:
+        server.quit()
+    except (smtplib.SMTPException, OSError):
+        server.close()
+
+def send_emails(pending, args, global_limiter, journal_file, journal_lock, credentials=None, server=None):
+    """Sends the (key, message) pairs queued up in pending over one SMTP connection until there are none left, reconnecting whenever the connection drops and retrying with exponential backoff"""
+    connection_limiter = RateLimiter(args.connection_rate)
+
+    while True:
+        try:
+            key, msg = pending.get_nowait()
+        except queue.Empty:
+            break
+
+        append_to_journal(journal_file, journal_lock, 'sending', key)
+        for attempt in range(args.retries + 1):
+            global_limiter.wait()
+            connection_limiter.wait()
+            try:
+                if server is None:  server = connect(args, credentials)
+                server.send_message(msg)
+                append_to_journal(journal_file, journal_lock, 'sent', key)
+                break
+
+            #The server will never take this one, no matter how often we retry
+            except smtplib.SMTPRecipientsRefused:
+                append_to_journal(journal_file, journal_lock, 'failed', key)
+                break
+
+            except (smtplib.SMTPException, OSError):
+                if server is not None:  disconnect(server)
+                server = None
+
+                if attempt == args.retries:     append_to_journal(journal_file, journal_lock, 'failed', key)
+                else:                           time.sleep(args.backoff * 2**attempt)
+
+    if server is not None:
+        disconnect(server)
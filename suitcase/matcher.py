@@ -0,0 +1,352 @@
+"""
+Fuzzy email matching -- finds the students on a roster who did not submit, even when some of them typed their email in wrong.
+
+Exact matches are a hash lookup and every leftover email is only scored against the few leftover submissions sharing the most character n-grams with it. scipy is only imported for the global (assignment=True) typo resolution.
+"""
+
+import os
+import time
+import heapq
+import itertools
+import numpy as np
+from fuzzywuzzy import fuzz
+from fuzzywuzzy import utils
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from termcolor import cprint
+
+from . import instrument
+
+#Below this many leftover rows, the similarity matrix is scored in-process
+PARALLEL_SCORING_MIN_ROWS = 1000
+
+def normalize_email(email):
+    """Given an email, returns its local-part processed the same way fuzzywuzzy processes strings before scoring them -- two emails with the same normalized form are a perfect (100) match
+    
+    >>> normalize_email('Kunal.Mishra9@gmail.com')
+    'kunal mishra9'
+    >>> normalize_email('oski@berkeley.edu ')
+    'oski'
+    """
+    return utils.full_process(email.split('@')[0], force_ascii=True)
+
+def get_ngrams(email, n=2):
+    """Given a normalized email, returns the set of its character n-grams (emails shorter than n are their own n-gram)
+    
+    >>> sorted(get_ngrams('oski'))
+    ['ki', 'os', 'sk']
+    >>> get_ngrams('k'), get_ngrams('')
+    ({'k'}, set())
+    """
+    if not email: return set()
+    return { email[i:i+n] for i in range(max(len(email) - n + 1, 1)) }
+
+def build_ngram_index(emails, n=2):
+    """Given an array of normalized emails, maps each character n-gram to the positions of the emails that contain it
+    
+    >>> index = build_ngram_index(['oski', 'rando'])
+    >>> index['sk'], index['ra']
+    ([0], [1])
+    """
+    index = defaultdict(list)
+    for position, email in enumerate(emails):
+        for ngram in get_ngrams(email, n):
+            index[ngram].append(position)
+    return index
+
+def get_candidates(index, email, n=2, limit=20):
+    """Given an n-gram index and a normalized email, returns the positions of the (at most limit) indexed emails sharing the most n-grams with it, in their original order
+    
+    >>> index = build_ngram_index(['kunalmishra9', 'oski', 'rando'])
+    >>> get_candidates(index, 'kmishra9')
+    [0, 2]
+    >>> get_candidates(index, 'zzz')
+    []
+    """
+    shared = defaultdict(int)
+    for ngram in get_ngrams(email, n):
+        for position in index.get(ngram, ()):
+            shared[position] += 1
+    
+    return sorted( heapq.nsmallest(limit, shared, key=lambda position: (-shared[position], position)) )
+
+def score_candidate_pairs(queries, choices, candidates):
+    """Given normalized query emails, normalized choice emails, and the candidate positions for each query, returns a flat NumPy array with the similarity score of every (query, candidate) pair, query by query
+    
+    >>> score_candidate_pairs(['kmishra9', 'oski'], ['kunalmishra9', 'rando'], [[0, 1], []])
+    array([80, 45], dtype=int8)
+    """
+    scores = [ fuzz.WRatio(query, choices[position], full_process=False) for query, positions in zip(queries, candidates) for position in positions ]
+    return np.array(scores, dtype=np.int8)
+
+def build_similarity_matrix(queries, choices, candidates, processes=None, sparse=False):
+    """Given normalized query emails, normalized choice emails, and the candidate positions for each query, scores every candidate pair at once into a single (queries x choices) NumPy array -- pairs that were never candidates score -1.
+    Large inputs have their rows split across a process pool (processes=None uses every core, processes=1 never forks). With sparse=True, returns a scipy.sparse CSR matrix holding only the candidate pairs instead
+    
+    >>> build_similarity_matrix(['kmishra9', 'oski'], ['kunalmishra9', 'oski'], [[0], [1]], processes=1)
+    array([[ 80,  -1],
+           [ -1, 100]], dtype=int8)
+    >>> build_similarity_matrix(['kmishra9', 'oski'], ['kunalmishra9', 'oski'], [[0], [1]], processes=1, sparse=True).nnz
+    2
+    """
+    processes = processes or os.cpu_count() or 1
+    rows      = np.repeat(np.arange(len(queries)), [len(positions) for positions in candidates])
+    columns   = np.fromiter(itertools.chain.from_iterable(candidates), dtype=int, count=len(rows))
+    
+    #Forking a pool only pays off once there are enough rows to score
+    if processes == 1 or len(queries) < PARALLEL_SCORING_MIN_ROWS:
+        scores = score_candidate_pairs(queries, choices, candidates)
+    else:
+        chunk_size = -(-len(queries) // processes)
+        chunks     = [ (queries[i:i+chunk_size], choices, candidates[i:i+chunk_size]) for i in range(0, len(queries), chunk_size) ]
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            scores = np.concatenate( list(executor.map(score_candidate_pairs, *zip(*chunks))) )
+    
+    if sparse:
+        import scipy.sparse
+        return scipy.sparse.csr_matrix( (scores, (rows, columns)), shape=(len(queries), len(choices)) )
+    
+    matrix = np.full((len(queries), len(choices)), -1, dtype=np.int8)
+    matrix[rows, columns] = scores
+    return matrix
+
+def assign_typos(similarity, cutoff=80):
+    """Given a sparse (leftover roster x leftover submissions) similarity matrix, returns the one-to-one (row, column) pairs that maximize the total similarity, only ever pairing emails that score at least cutoff.
+    Pairs above the cutoff are rare, so the assignment is solved separately (with scipy's linear_sum_assignment) on each small connected group of rows and columns instead of on one dense matrix
+    
+    >>> import scipy.sparse
+    >>> similarity = scipy.sparse.csr_matrix(np.array([[90, 85, 0], [88, 0, 0], [0, 0, 45]]))
+    >>> assign_typos(similarity)
+    [(0, 1), (1, 0)]
+    """
+    import scipy.sparse
+    from scipy.optimize import linear_sum_assignment
+    from scipy.sparse.csgraph import connected_components
+
+    num_rows, num_columns = similarity.shape
+    if num_rows == 0 or num_columns == 0:   return []
+    
+    confident = similarity.multiply(similarity >= cutoff).tocsr()
+    confident.eliminate_zeros()
+    
+    #Rows and columns that could claim each other (directly or through a chain) land in the same component
+    graph                   = scipy.sparse.bmat([[None, confident], [confident.T, None]])
+    num_components, labels  = connected_components(graph, directed=False)
+    group                   = lambda positions_labels: np.split( np.argsort(positions_labels, kind='stable'), np.cumsum(np.bincount(positions_labels, minlength=num_components))[:-1] )
+    
+    pairs = []
+    for rows, columns in zip(group(labels[:num_rows]), group(labels[num_rows:])):
+        if len(rows) == 0 or len(columns) == 0: continue
+        
+        block = confident[rows][:, columns].toarray()
+        for row, column in zip(*linear_sum_assignment(block, maximize=True)):
+            if block[row, column] > 0:  pairs.append( (int(rows[row]), int(columns[column])) )
+    
+    return sorted(pairs)
+
+def warn_suspicious_match(email, most_similar_email, score, confirm=None):
+    """Prints a warning asking the user to check on a roster email whose closest submission (as it was typed, or None if there was no candidate) could not be trusted, along with the score it was flagged at -- the similarity of the two local-parts, which is all matching compares.
+    Returns whether confirm(email, most_similar_email, score), if given, says the submission does belong to that student after all"""
+    cprint("**********", 'blue')
+    if most_similar_email is None:
+        cprint("Please check on " + email + ". We found no similar email in the submissions. ", 'red' )
+    else:
+        cprint("Please check on " + email + ". The most similar email we found in the submissions was " + most_similar_email + " with a similarity score of " + str(score) + " out of 100. ", 'red' )
+    cprint("**********", 'blue')
+    
+    return confirm is not None and most_similar_email is not None and bool(confirm(email, most_similar_email, score))
+
+def find_fuzzy_matches(all_emails, submission_emails, processes=None, assignment=False, cutoff=80, return_matches=False, aliases=None, confirm=None, all_keys=None):
+    """Given an array of all emails and an array of submission emails, uses fuzzy string matching to find all emails that did not submit (processes is passed through to build_similarity_matrix)
+    
+    By default, typos are resolved greedily from the highest scoring rows. With assignment=True, they are instead resolved by a global one-to-one assignment between the unmatched roster emails and the unmatched submissions (see assign_typos),
+    and the closest roster email of every submission left unassigned is flagged. Either way, a typo scoring below cutoff (out of 100) is flagged rather than resolved
+    
+    With return_matches=True, also returns a dict mapping every roster email that did submit to the (local-part of the) submission it was matched with
+    
+    aliases maps normalized submission emails (see normalize_email) to the roster email they are known to belong to, and is checked before any fuzzy scoring. confirm is passed through to warn_suspicious_match,
+    so that a flagged submission can still be matched when the user vouches for it. all_keys can hold the already normalized all_emails (in the same order), so that a roster shared by many calls is only normalized once
+    
+    ============Suite 1============
+    >>> all_emails        = ['kunalmishra9@gmail.com', 'kmishra9@berkeley.edu', 'oski@berkeley.edu']
+    >>> submission_emails = ['kunalmishra9@gmail.com', 'kmishra9@berkeley.edu', 'oski@berkeley.edu']
+    >>> find_fuzzy_matches(all_emails, submission_emails)
+    []
+    >>> submission_emails = ['kunalmishra9@gmial', 'kmishra9@berkeley.edu', 'oski@berkeley.edu']
+    >>> find_fuzzy_matches(all_emails, submission_emails)
+    []
+    >>> submission_emails = ['kunalmishra9@gmial ', 'kmishra9@berkeley', 'oski@berkeley.edu ']
+    >>> find_fuzzy_matches(all_emails, submission_emails)
+    []
+    
+    ============Suite 2============
+    >>> all_emails        = ['kunalmishra9@gmail.com', 'kmishra9@berkeley.edu', 'oski@berkeley.edu']
+    >>> submission_emails = ['oski@berkeley.edu ']
+    >>> find_fuzzy_matches(all_emails, submission_emails)
+    ['kunalmishra9@gmail.com', 'kmishra9@berkeley.edu']
+    >>> submission_emails = ['kmishra9@berkeley ','oski@berkeley.edu ']
+    >>> find_fuzzy_matches(all_emails, submission_emails)
+    ['kunalmishra9@gmail.com']
+    
+    ============Suite 3============
+    >>> all_emails        = ['kunalmishra9@gmail.com', 'kmishra9@berkeley.edu', 'oski@berkeley.edu']
+    >>> submission_emails = ['kunalmishra9@gmail.com', 'kmishra9@berkeley.edu', 'oski@berkeley.edu', 'rando@berkeley']
+    >>> find_fuzzy_matches(all_emails, submission_emails)
+    []
+    >>> submission_emails = ['kunalmishra9@gmail.com', 'oski@berkeley.edu', 'rando@berkeley']
+    >>> find_fuzzy_matches(all_emails, submission_emails)
+    **********
+    Please check on kmishra9@berkeley.edu. The most similar email we found in the submissions was rando@berkeley with a similarity score of 45 out of 100. 
+    **********
+    ['kmishra9@berkeley.edu']
+    
+    ============Suite 4============
+    >>> all_emails        = ['kunalmishra9@gmail.com', 'kmishra9@berkeley.edu', 'oski@berkeley.edu']
+    >>> submission_emails = ['kunalmishra9@gmial', 'kmishra9@berkely', 'oski@berkeley.edu']
+    >>> find_fuzzy_matches(all_emails, submission_emails, assignment=True)
+    []
+    >>> submission_emails = ['kunalmishra9@gmail.com', 'oski@berkeley.edu', 'rando@berkeley']
+    >>> find_fuzzy_matches(all_emails, submission_emails, assignment=True)
+    **********
+    Please check on kmishra9@berkeley.edu. The most similar email we found in the submissions was rando@berkeley with a similarity score of 45 out of 100. 
+    **********
+    ['kmishra9@berkeley.edu']
+    >>> submission_emails = ['kunalmishr9@gmail.com', 'kmishra@berkeley.edu', 'oski@berkeley.edu']
+    >>> find_fuzzy_matches(all_emails, submission_emails, assignment=True)
+    []
+    
+    ============Suite 5============
+    >>> all_emails        = ['kunalmishra9@gmail.com', 'kmishra9@berkeley.edu', 'oski@berkeley.edu']
+    >>> submission_emails = ['kunalmishra9@gmial', 'oski@berkeley.edu ']
+    >>> find_fuzzy_matches(all_emails, submission_emails, return_matches=True)
+    (['kmishra9@berkeley.edu'], {'kunalmishra9@gmail.com': 'kunalmishra9', 'oski@berkeley.edu': 'oski'})
+    
+    ============Suite 6============
+    >>> all_emails        = ['kunalmishra9@gmail.com', 'kmishra9@berkeley.edu', 'oski@berkeley.edu']
+    >>> submission_emails = ['kunalmishra9@gmail.com', 'oski@berkeley.edu', 'rando@berkeley']
+    >>> find_fuzzy_matches(all_emails, submission_emails, aliases={'rando': 'kmishra9@berkeley.edu'})
+    []
+    >>> find_fuzzy_matches(all_emails, submission_emails, return_matches=True, confirm=lambda email, most_similar_email, score: True)[1]['kmishra9@berkeley.edu']
+    **********
+    Please check on kmishra9@berkeley.edu. The most similar email we found in the submissions was rando@berkeley with a similarity score of 45 out of 100. 
+    **********
+    'rando'
+    """
+    started = time.perf_counter()
+    
+    # Sanitizing input email lists
+    submission_emails = [email for email in submission_emails if type(email) == str]
+    all_emails = [email for email in all_emails if type(email) == str]
+    
+    #Matching only looks at local-parts, but warnings name each submission as it was typed
+    typed_submissions = dict()
+    for student_email in submission_emails:     typed_submissions.setdefault(student_email.split('@')[0], student_email.strip())
+    
+    submission_emails = [student_email.split('@')[0] for student_email in submission_emails]
+    
+    num_students, num_submissions = len(all_emails), len(submission_emails)
+    
+    #Exact matches are a hash lookup -- only the leftover emails need any fuzzy scoring
+    all_keys        = [normalize_email(student_email) for student_email in all_emails] if all_keys is None else list(all_keys)
+    submission_keys = [normalize_email(student_email) for student_email in submission_emails]
+    exact_matches   = set(all_keys).intersection(submission_keys) - {''}
+    
+    leftover_emails      = [email for email, key in zip(all_emails, all_keys) if key not in exact_matches]
+    leftover_keys        = [key for key in all_keys if key not in exact_matches]
+    leftover_submissions = [email for email, key in zip(submission_emails, submission_keys) if key not in exact_matches]
+    leftover_submission_keys = [key for key in submission_keys if key not in exact_matches]
+    
+    submission_by_key = dict()
+    for email, key in zip(submission_emails, submission_keys):  submission_by_key.setdefault(key, email)
+    matches = { email: submission_by_key[key] for email, key in zip(all_emails, all_keys) if key in exact_matches }
+    num_exact_matches = len(matches)
+    
+    #Typos resolved on earlier runs (or homeworks) are a hash lookup too
+    aliased_emails, leftover_set = dict(), set(leftover_emails)
+    for email, key in zip(leftover_submissions, leftover_submission_keys):
+        student_email = (aliases or dict()).get(key)
+        if student_email in leftover_set and student_email not in aliased_emails:  aliased_emails[student_email] = email
+    
+    if aliased_emails:
+        aliased_keys             = { normalize_email(email) for email in aliased_emails.values() }
+        leftover_keys            = [key for email, key in zip(leftover_emails, leftover_keys) if email not in aliased_emails]
+        leftover_emails          = [email for email in leftover_emails if email not in aliased_emails]
+        leftover_submissions     = [email for email, key in zip(leftover_submissions, leftover_submission_keys) if key not in aliased_keys]
+        leftover_submission_keys = [key for key in leftover_submission_keys if key not in aliased_keys]
+        matches.update(aliased_emails)
+    
+    missing_submissions = np.arange(len(leftover_emails))
+    num_missing_submissions = len(missing_submissions)
+    
+    #Logical error or issue with input files    
+    if num_missing_submissions + num_submissions < num_students:
+        error_msg =  "Something went wrong -- most likely, your roster is incomplete or a student submitted twice, please correct the input files\n\n"
+        error_msg += "Here are the students with 'missing' submissions' " + str(leftover_emails) 
+        assert False, error_msg
+    
+    #Each leftover email is only scored against the leftover submissions sharing the most n-grams with it
+    index      = build_ngram_index(leftover_submission_keys)
+    candidates = [get_candidates(index, key) for key in leftover_keys]
+    similarity = build_similarity_matrix(leftover_keys, leftover_submission_keys, candidates, processes, sparse=assignment)
+    
+    num_resolved, num_flagged, num_confirmed = 0, 0, 0
+    if assignment:
+        resolved = assign_typos(similarity, cutoff)
+        assigned_rows, assigned_columns = {row for row, _ in resolved}, {column for _, column in resolved}
+        
+        #Submissions nobody confidently claimed are strays or unusual typos -- their closest roster email needs a second look
+        if similarity.nnz:
+            best_scores, best_rows = similarity.max(axis=0).toarray().ravel(), np.asarray(similarity.argmax(axis=0)).ravel()
+            flagged = dict()
+            for column in np.argsort(-best_scores, kind='stable'):
+                if column not in assigned_columns and best_scores[column] > 0 and best_rows[column] not in assigned_rows:
+                    flagged.setdefault(best_rows[column], column)
+            
+            for row in sorted(flagged):
+                if warn_suspicious_match(leftover_emails[row], typed_submissions[leftover_submissions[flagged[row]]], best_scores[flagged[row]], confirm):
+                    resolved.append( (row, flagged[row]) )
+                    assigned_rows.add(row)
+                    num_confirmed += 1
+            num_flagged = len(flagged)
+        
+        num_resolved = len(resolved) - num_confirmed
+        
+        missing_submissions = [row for row in missing_submissions if row not in assigned_rows]
+        matches.update({ leftover_emails[row]: leftover_submissions[column] for row, column in resolved })
+    
+    #False negatives -- people inputted their email incorrectly
+    elif num_missing_submissions + num_submissions > num_students:
+        num_false_negatives = num_missing_submissions + num_submissions - num_students 
+        
+        #A top score of -1 means there was no candidate submission at all
+        if similarity.shape[1] == 0:    top_scores, most_similar = np.full(len(leftover_emails), -1), np.zeros(len(leftover_emails), dtype=int)
+        else:                           top_scores, most_similar = similarity.max(axis=1), similarity.argmax(axis=1)
+        
+        missing_submissions = np.argsort(-top_scores, kind='stable')
+        
+        #Only the top num_false_negatives rows are resolved as typos, unless their closest submission looks suspicious
+        first_letters       = np.array([email[:1] for email in leftover_emails])
+        similar_letters     = np.array([email[:1] for email in leftover_submissions] or [''])[most_similar]
+        suspicious          = (top_scores < cutoff) | (first_letters != similar_letters)
+        
+        flagged = [position for position in missing_submissions[:num_false_negatives] if suspicious[position]]
+        num_flagged = len(flagged)
+        for position in list(flagged):
+            if warn_suspicious_match(leftover_emails[position], typed_submissions[leftover_submissions[most_similar[position]]] if top_scores[position] != -1 else None, top_scores[position], confirm):
+                flagged.remove(position)
+        
+        num_confirmed = num_flagged - len(flagged)
+        num_resolved  = len(missing_submissions[:num_false_negatives]) - num_flagged
+            
+        #Getting rid of false negatives (people who were the closest fuzzy matches)
+        matches.update({ leftover_emails[position]: leftover_submissions[most_similar[position]] for position in missing_submissions[:num_false_negatives] if position not in flagged })
+        missing_submissions = list(missing_submissions[num_false_negatives:]) + flagged
+    
+    missing_submissions = [leftover_emails[position] for position in missing_submissions]
+    
+    instrument.record('match', time.perf_counter() - started, students=num_students, submissions=num_submissions, exact_matches=num_exact_matches, aliased=len(aliased_emails),
+                      leftover=len(leftover_emails), candidates_scored=sum(len(positions) for positions in candidates), typos_resolved=num_resolved, flagged=num_flagged, confirmed=num_confirmed,
+                      missing=len(missing_submissions))
+    
+    if return_matches:  return missing_submissions, matches
+    return missing_submissions
@@ -0,0 +1,85 @@
+"""
+Reports on which homeworks each student missed, kept as a (students x homeworks) boolean matrix that can be saved and reported on again without regrading.
+"""
+
+import numpy as np
+import pandas as pd
+from termcolor import cprint
+
+def build_missing_matrix(roster_emails, students_without_submissions):
+    """Given the roster's emails (in roster order) and the students missing from each homework, returns a (students x homeworks) boolean NumPy array that is True wherever a student missed a homework
+    
+    >>> build_missing_matrix(['a@berkeley.edu', 'b@berkeley.edu', 'c@berkeley.edu'], [['b@berkeley.edu'], ['b@berkeley.edu', 'c@berkeley.edu']])
+    array([[False, False],
+           [ True,  True],
+           [False,  True]])
+    """
+    roster_emails = pd.Series(roster_emails)
+    
+    matrix = np.zeros((len(roster_emails), len(students_without_submissions)), dtype=bool)
+    for column, missing_submissions in enumerate(students_without_submissions):
+        matrix[:, column] = roster_emails.isin(missing_submissions).values
+    return matrix
+
+def get_longest_streaks(matrix):
+    """Given a missing-submission matrix, returns the longest run of consecutive homeworks each student missed
+    
+    >>> get_longest_streaks(np.array([[True, True, False, True], [False, True, True, True], [False, False, False, False]]))
+    array([2, 3, 0])
+    """
+    if matrix.shape[1] == 0:    return np.zeros(len(matrix), dtype=int)
+    
+    #Counting misses along each row, and taking off however many had been counted when the current run started
+    missed_so_far = np.cumsum(matrix, axis=1)
+    run_start     = np.maximum.accumulate(np.where(matrix, 0, missed_so_far), axis=1)
+    return (missed_so_far - run_start).max(axis=1)
+
+def save_missing_matrix(path, roster, matrix, homework_numbers):
+    """Saves a (bit-packed) missing-submission matrix, the homework number of each of its columns, and the roster columns needed to report on it"""
+    roster_columns = { column: roster[column].astype(str).to_numpy(dtype=str) for column in ["Name", "Email", "UGSI"] }
+    np.savez_compressed(path, missing=np.packbits(matrix, axis=1), num_homeworks=matrix.shape[1], homework_numbers=np.array(homework_numbers), **roster_columns)
+
+def load_missing_matrix(path):
+    """Returns the (roster, matrix, homework numbers) saved by save_missing_matrix"""
+    with np.load(path) as saved:
+        matrix = np.unpackbits(saved['missing'], axis=1, count=int(saved['num_homeworks'])).astype(bool)
+        roster = pd.DataFrame({ column: saved[column] for column in ["Name", "Email", "UGSI"] })
+        return roster, matrix, saved['homework_numbers'].tolist()
+
+def get_missed_homeworks(roster, matrix, homework_numbers):
+    """Returns the email, name and UGSI of every student who missed a homework, along with the (space-separated) numbers of the homeworks they missed
+
+    >>> roster = pd.DataFrame({'Name': ['Ann', 'Bob', 'Cat'], 'Email': ['a@berkeley.edu', 'b@berkeley.edu', 'c@berkeley.edu'], 'UGSI': ['X', 'Y', 'X']})
+    >>> get_missed_homeworks(roster, np.array([[False, False], [True, True], [False, True]]), [3, 4])
+                Email Name UGSI Missed homeworks
+    1  b@berkeley.edu  Bob    Y              3 4
+    2  c@berkeley.edu  Cat    X                4
+    """
+    homework_numbers = np.array(homework_numbers, dtype=str)
+    missed           = [' '.join(homework_numbers[row]) for row in matrix]
+    return roster[["Email", "Name", "UGSI"]].assign(**{'Missed homeworks': missed})[matrix.any(axis=1)]
+
+def report_missing_homeworks(roster, matrix, homework_numbers, streak=3):
+    """Prints every student who missed a homework, sorted by the number of homework assignments they missed and their UGSI, followed by how many homeworks each UGSI's students missed,
+    and the students who missed streak (or more) homeworks in a row. Returns the sorted table of students"""
+    columns = ["Name", "Email", "UGSI"]
+    totals  = matrix.sum(axis=1)
+    
+    output = roster[totals > 0].assign(**{'Num missing': totals[totals > 0]}).reset_index()
+    output = output.sort_values(by=["Num missing", "UGSI"], ascending=False)
+    
+    cprint("========================================================================", 'blue')
+    print( output[columns+['Num missing']].head(len(output)) )
+    cprint("========================================================================", 'blue')
+    
+    by_ugsi = pd.DataFrame(matrix, columns=["HW" + str(number) for number in homework_numbers]).groupby(roster['UGSI'].values, observed=True).sum()
+    print( by_ugsi.assign(Total=by_ugsi.sum(axis=1)) )
+    cprint("========================================================================", 'blue')
+    
+    streaks = get_longest_streaks(matrix)
+    if (streaks >= streak).any():
+        cprint("Missed " + str(streak) + " or more homeworks in a row:", 'red')
+        print( roster[streaks >= streak][columns].assign(**{'Longest streak': streaks[streaks >= streak]}).to_string(index=False) )
+        cprint("========================================================================", 'blue')
+    
+    return output
@@ -0,0 +1,221 @@
+"""
+A long-running submission-status service -- the roster and homework sheets are loaded and graded once, kept in memory, and refreshed in the background, so that questions like
+"did this student submit HW3?" or "who in my section is missing something?" are answered straight from memory over a small local HTTP/JSON API:
+
+    GET /status?email=EMAIL[&homework=N]        the student's name, UGSI and missed homeworks (and whether they submitted homework N)
+    GET /missing[?homework=N][&ugsi=UGSI]       every student missing homework N (or any homework), optionally only from one UGSI's section
+    GET /health                                 when the sheets were last refreshed, how big they are, and the last refresh error (if any)
+
+Refreshing goes through the sheet cache and each homework's grading state, so a refresh where nothing changed costs a few conditional requests, and new responses are the only ones graded.
+"""
+
+import io
+import json
+import time
+import signal
+import threading
+import contextlib
+import http.server
+import urllib.parse
+import multiprocessing
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from .cache import SHEET_CACHE_DIR, GRADING_STATE_DIR, ALIAS_TABLE_DIR
+from .matcher import normalize_email
+
+#Everything a query needs, rebuilt on every refresh and swapped in whole -- students are dicts ready to be sent as JSON, indexed by their email, by their email's local-part (None when students share it), by each homework they missed and by whether they missed any
+StatusSnapshot = namedtuple('StatusSnapshot', ['refreshed', 'homework_numbers', 'students', 'by_email', 'by_local_part', 'missing_by_homework', 'missing_any'])
+
+def get_email_key(email):
+    """Returns the key a student is looked up by their whole email under -- emails that only differ in case or surrounding spaces share it
+
+    >>> get_email_key(' Oski@Berkeley.edu')
+    'oski@berkeley.edu'
+    """
+    return email.strip().lower()
+
+def build_snapshot(roster, matrix, homework_numbers):
+    """Given the roster, its missing-submission matrix and the homework number of each column, returns the StatusSnapshot queries are answered from
+
+    >>> import numpy as np, pandas as pd
+    >>> roster = pd.DataFrame({'Name': ['Ann', 'Bob'], 'Email': ['ann@berkeley.edu', 'bob@berkeley.edu'], 'UGSI': ['X', 'Y']})
+    >>> snapshot = build_snapshot(roster, np.array([[False, True], [False, False]]), [3, 4])
+    >>> snapshot.by_email['ann@berkeley.edu'], snapshot.missing_by_homework
+    ({'email': 'ann@berkeley.edu', 'name': 'Ann', 'ugsi': 'X', 'missed': [4]}, {3: [], 4: [{'email': 'ann@berkeley.edu', 'name': 'Ann', 'ugsi': 'X', 'missed': [4]}]})
+    """
+    text     = lambda value: value if type(value) == str else None
+    students = [ {'email': email, 'name': text(name), 'ugsi': text(ugsi), 'missed': [int(number) for number, missed in zip(homework_numbers, row) if missed]}
+                 for email, name, ugsi, row in zip(roster['Email'], roster['Name'], roster['UGSI'], matrix) if type(email) == str ]
+
+    by_email            = { get_email_key(student['email']): student for student in students }
+    by_local_part       = dict()
+    for student in students:
+        local_part                = normalize_email(student['email'])
+        by_local_part[local_part] = None if local_part in by_local_part else student
+    missing_by_homework = { int(number): [student for student in students if number in student['missed']] for number in homework_numbers }
+    missing_any         = [student for student in students if student['missed']]
+    return StatusSnapshot(time.time(), [int(number) for number in homework_numbers], students, by_email, by_local_part, missing_by_homework, missing_any)
+
+def load_snapshot(roster_url, homework_urls, first_homework, loader_options, state_dir, alias_dir, assignment=False, cutoff=80):
+    """Loads every sheet, grades whatever changed (matching typos as find_fuzzy_matches does with assignment and cutoff) and returns the new StatusSnapshot, along with everything loading and grading printed.
+    Runs in SubmissionStatus's own worker process, so capturing what it prints never swaps out the sys.stdout of the server's threads"""
+    from .loader import load_data_into_frames
+    from .grading import get_state_path, build_roster_index, load_aliases, save_aliases, grade_homeworks
+    from .report import build_missing_matrix
+
+    with contextlib.redirect_stdout(io.StringIO()) as output:
+        roster, *homework_responses = load_data_into_frames([roster_url] + homework_urls, **loader_options)
+
+        columns = ["Name", "Email", "UGSI"]
+        assert all(column in roster.columns for column in columns), "Structure of Roster File is incorrect -- need the following columns:\n\t" + str(columns)
+
+        #Indexed in roster order (without duplicates), so ties between typos always go the same way
+        roster_index       = build_roster_index(dict.fromkeys(roster['Email']))
+        roster_version     = roster_index.version
+        aliases            = load_aliases(alias_dir, roster_version)
+        state_paths        = [get_state_path(state_dir, url) for url in homework_urls]
+
+        students_without_submissions = grade_homeworks(roster_index, [homework_response['Email'] for homework_response in homework_responses], state_paths, aliases, processes=1, assignment=assignment, cutoff=cutoff)
+        save_aliases(alias_dir, roster_version, aliases)
+
+        homework_numbers = list( range(first_homework, first_homework + len(homework_responses)) )
+        snapshot         = build_snapshot(roster, build_missing_matrix(roster['Email'], students_without_submissions), homework_numbers)
+    return snapshot, output.getvalue()
+
+def ignore_interrupts():
+    """Runs once in SubmissionStatus's worker process -- Ctrl-C reaches the whole process group, but stopping the worker is left to the server (see SubmissionStatus.close)"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+class SubmissionStatus:
+    """Keeps the latest StatusSnapshot of a roster and its homework sheets (see refresh), and answers queries from it (see answer)"""
+
+    def __init__(self, roster_url, homework_urls, first_homework=1, loader_options=None, state_dir=GRADING_STATE_DIR, alias_dir=ALIAS_TABLE_DIR, assignment=False, cutoff=80):
+        self.roster_url     = roster_url
+        self.homework_urls  = list(homework_urls)
+        self.first_homework = first_homework
+        self.loader_options = dict(loader_options or dict(cache_dir=SHEET_CACHE_DIR))
+        self.state_dir      = state_dir
+        self.alias_dir      = alias_dir
+        self.matching       = dict(assignment=assignment, cutoff=cutoff)
+
+        self.snapshot   = None
+        self.output     = ''
+        self.last_error = None
+        self.lock       = threading.Lock()
+        self.executor   = None
+
+    def refresh(self):
+        """Reloads every sheet, grades whatever changed and swaps in a new snapshot -- queries keep being answered from the old one until then. What loading and grading printed is kept in output.
+        The work is done in a worker process kept for every refresh (see load_snapshot), which also leaves the server's threads the whole interpreter while a refresh grades"""
+        #Only one refresh at a time
+        with self.lock:
+            #A spawned (rather than forked) worker never inherits the server's threads, or the locks they hold
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn'), initializer=ignore_interrupts)
+
+            try:
+                snapshot, output = self.executor.submit(load_snapshot, self.roster_url, self.homework_urls, self.first_homework, self.loader_options, self.state_dir, self.alias_dir, **self.matching).result()
+            except BrokenProcessPool:
+                #The next refresh starts a new worker
+                self.executor = None
+                raise
+
+            self.snapshot, self.output, self.last_error = snapshot, output, None
+
+    def close(self):
+        """Stops the worker process refreshes run in"""
+        with self.lock:
+            if self.executor is not None:
+                self.executor.shutdown()
+                self.executor = None
+
+    def refresh_every(self, seconds, stop):
+        """Refreshes every seconds until the stop Event is set -- a failed refresh is recorded in last_error, and the last good snapshot keeps being served"""
+        while not stop.wait(seconds):
+            try:
+                self.refresh()
+            except Exception as error:
+                self.last_error = type(error).__name__ + ': ' + str(error)
+
+    def answer(self, path):
+        """Given the path (and query string) of a GET request, returns its (HTTP status, JSON-able answer) -- students are looked up by their whole email, or by its local-part alone when no other student shares it
+
+        >>> import numpy as np, pandas as pd
+        >>> roster = pd.DataFrame({'Name': ['Ann', 'Jo', 'Jay'], 'Email': ['ann@berkeley.edu', 'jsmith@berkeley.edu', 'jsmith@gmail.com'], 'UGSI': ['X', 'Y', 'Y']})
+        >>> status = SubmissionStatus('roster', ['hw3'])
+        >>> status.snapshot = build_snapshot(roster, np.array([[True], [False], [True]]), [3])
+        >>> [status.answer('/status?email=' + email)[0] for email in ['Ann@Berkeley.edu', 'ann', 'ann@gmail.com']]
+        [200, 200, 404]
+        >>> status.answer('/status?email=jsmith@gmail.com&homework=3')[1]['name'], status.answer('/status?email=jsmith')
+        ('Jay', (404, {'error': "More than one student on the roster has an email starting with 'jsmith' -- give the whole email"}))
+        """
+        snapshot = self.snapshot
+        url      = urllib.parse.urlsplit(path)
+        query    = { name: values[-1] for name, values in urllib.parse.parse_qs(url.query).items() }
+
+        if url.path == '/health':
+            return 200, {'refreshed': snapshot and time.strftime('%Y-%m-%dT%H:%M:%S%z', time.localtime(snapshot.refreshed)), 'students': snapshot and len(snapshot.students),
+                         'homeworks': snapshot and snapshot.homework_numbers, 'last_error': self.last_error}
+        if url.path not in ('/status', '/missing'):
+            return 404, {'error': "Unknown path -- try /status?email=EMAIL, /missing?homework=N&ugsi=UGSI or /health"}
+        if snapshot is None:
+            return 503, {'error': "The sheets haven't finished loading yet"}
+
+        homework = query.get('homework')
+        if homework is not None and (not homework.isdigit() or int(homework) not in snapshot.missing_by_homework):
+            return 404, {'error': "No homework " + homework + " -- the homeworks are " + str(snapshot.homework_numbers)}
+
+        if url.path == '/status':
+            email = query.get('email', '')
+            #Without a domain, the local-part alone only finds a student when no other student's email starts with it
+            if '@' in email:    student = snapshot.by_email.get(get_email_key(email), False)
+            else:               student = snapshot.by_local_part.get(normalize_email(email), False)
+            if student is None:
+                return 404, {'error': "More than one student on the roster has an email starting with " + repr(email) + " -- give the whole email"}
+            if not student:
+                return 404, {'error': "No student with the email " + repr(query.get('email')) + " is on the roster"}
+            return 200, student if homework is None else dict(student, homework=int(homework), submitted=int(homework) not in student['missed'])
+
+        students = snapshot.missing_by_homework[int(homework)] if homework is not None else snapshot.missing_any
+        if 'ugsi' in query:
+            students = [student for student in students if (student['ugsi'] or '').lower() == query['ugsi'].lower()]
+        return 200, {'homework': homework and int(homework), 'ugsi': query.get('ugsi'), 'students': students}
+
+class StatusHandler(http.server.BaseHTTPRequestHandler):
+    """Answers GET requests from the server's SubmissionStatus, keeping connections alive between requests"""
+    protocol_version = 'HTTP/1.1'
+    #The headers and body go out as two small writes -- with Nagle's algorithm the body would wait on the client's delayed ACK (~40ms) on every kept-alive request
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        code, answer = self.server.status.answer(self.path)
+        body         = json.dumps(answer).encode()
+
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:     super().log_message(format, *args)
+
+def make_server(status, host='127.0.0.1', port=8000, verbose=False):
+    """Returns a (not yet started) HTTP server answering queries from status, one thread per connection
+
+    >>> import threading, urllib.request
+    >>> import numpy as np, pandas as pd
+    >>> status = SubmissionStatus('roster', ['hw1'])
+    >>> status.snapshot = build_snapshot(pd.DataFrame({'Name': ['Oski'], 'Email': ['oski@berkeley.edu'], 'UGSI': ['Alice']}), np.array([[True]]), [1])
+    >>> server = make_server(status, port=0)
+    >>> threading.Thread(target=server.serve_forever, daemon=True).start()
+    >>> json.load(urllib.request.urlopen('http://127.0.0.1:' + str(server.server_port) + '/status?email=oski@berkeley.edu&homework=1'))
+    {'email': 'oski@berkeley.edu', 'name': 'Oski', 'ugsi': 'Alice', 'missed': [1], 'homework': 1, 'submitted': False}
+    >>> server.shutdown(); server.server_close()
+    """
+    server         = http.server.ThreadingHTTPServer((host, port), StatusHandler)
+    server.status  = status
+    server.verbose = verbose
+    return server
@@ -0,0 +1,18 @@
+"""
+Fixtures the tests share.
+"""
+
+import threading
+
+import pytest
+
+from sheet_server import SheetServer
+
+@pytest.fixture
+def sheet_server():
+    """A running SheetServer, stopped once the test is done"""
+    server = SheetServer()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,58 @@
+"""
+A local HTTP server standing in for Google Sheets, serving each sheet's CSV export the way the loader asks for it (see the sheet_server fixture in conftest.py).
+"""
+
+import http.server
+
+class Sheet:
+    """A sheet served by SheetServer -- its CSV export, the validators (ETag and Last-Modified) sent with it, if any, and how many more times it answers 503 before it is served"""
+
+    def __init__(self, body, etag=None, last_modified=None, failures=0):
+        self.body          = body
+        self.etag          = etag
+        self.last_modified = last_modified
+        self.failures      = failures
+
+class SheetHandler(http.server.BaseHTTPRequestHandler):
+    """Answers GET /<name>/export?... with the server's sheet of that name, and 304 when the request's validators still match it"""
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        name  = self.path.split('/')[1]
+        sheet = self.server.sheets[name]
+        self.server.requested.append(name)
+        if self.server.on_request is not None:  self.server.on_request(name)
+
+        headers = dict()
+        if sheet.failures:
+            sheet.failures -= 1
+            status, body = 503, b''
+        elif (sheet.etag and self.headers.get('If-None-Match') == sheet.etag) or (sheet.last_modified and self.headers.get('If-Modified-Since') == sheet.last_modified):
+            status, body = 304, b''
+        else:
+            status, body = 200, sheet.body
+            if sheet.etag:          headers['ETag']          = sheet.etag
+            if sheet.last_modified: headers['Last-Modified'] = sheet.last_modified
+
+        self.send_response(status)
+        for header, value in headers.items():   self.send_header(header, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+class SheetServer(http.server.ThreadingHTTPServer):
+    """Serves the Sheets in sheets (by name) on a free local port, recording the name of every sheet requested -- on_request, if set, is called with each name before it is answered"""
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), SheetHandler)
+        self.sheets     = dict()
+        self.requested  = []
+        self.on_request = None
+
+    def url(self, name, gid='#gid=0'):
+        """Returns the URL of the sheet called name, as copied from the URL bar"""
+        return 'http://127.0.0.1:' + str(self.server_port) + '/' + name + '/edit' + gid
@@ -0,0 +1,69 @@
+import threading
+
+import pytest
+
+from sheet_server import Sheet
+from suitcase import instrument
+from suitcase.loader import create_session, fetch_frame, load_data_into_frames
+
+ROSTER = b'First Name,Last Name,Email Address,UGSI\nOski,Bear,oski@berkeley.edu,Alice\nKunal,Mishra,kmishra9@berkeley.edu,Bob\n'
+OSKI   = b'Email Address\noski@berkeley.edu\n'
+KUNAL  = b'Email Address\nkmishra9@berkeley.edu\n'
+
+def test_sheets_load_concurrently_in_order_once_each(sheet_server):
+    sheet_server.sheets.update(roster=Sheet(ROSTER), hw1=Sheet(ROSTER), hw2=Sheet(KUNAL))
+
+    #Every sheet is held back until all of them have been asked for -- fetched one at a time, they would time out
+    arrived = threading.Barrier(len(sheet_server.sheets), timeout=5)
+    sheet_server.on_request = lambda name: arrived.wait()
+
+    frames = load_data_into_frames([sheet_server.url('hw2'), sheet_server.url('roster'), sheet_server.url('hw1'), sheet_server.url('hw1', '?gid=0')], cache_dir=None)
+
+    assert [df['Email'].tolist() for df in frames] == [['kmishra9@berkeley.edu']] + [['oski@berkeley.edu', 'kmishra9@berkeley.edu']] * 3
+    assert frames[1].columns.tolist() == ['Email', 'UGSI', 'Name']
+    assert frames[2] is frames[3]
+    assert sorted(sheet_server.requested) == ['hw1', 'hw2', 'roster']
+
+def test_overloaded_server_is_retried(sheet_server):
+    sheet_server.sheets['flaky'] = Sheet(KUNAL, failures=1)
+
+    frames = load_data_into_frames([sheet_server.url('flaky')], cache_dir=None, backoff=0.01)
+
+    assert frames[0]['Email'].tolist() == ['kmishra9@berkeley.edu']
+    assert sheet_server.requested == ['flaky', 'flaky']
+
+def fetch(sheet_server, name, cache_dir, **options):
+    """Fetches the sheet called name, and returns its emails along with where fetch_frame says they came from"""
+    with create_session() as session, instrument.collect() as events:
+        df = fetch_frame(session, sheet_server.url(name), str(cache_dir), **options)
+    return df['Email'].tolist(), events[0]['source']
+
+@pytest.mark.parametrize('validators', [dict(etag='"v1"'), dict(last_modified='Fri, 16 Oct 2026 12:00:00 GMT')])
+def test_validated_sheets_are_only_downloaded_once_changed(sheet_server, tmp_path, validators):
+    sheet_server.sheets['hw1'] = Sheet(OSKI, **validators)
+
+    assert fetch(sheet_server, 'hw1', tmp_path) == (['oski@berkeley.edu'], 'download')
+    assert fetch(sheet_server, 'hw1', tmp_path) == (['oski@berkeley.edu'], 'not modified')
+
+    sheet_server.sheets['hw1'] = Sheet(KUNAL, etag='"v2"', last_modified='Sat, 17 Oct 2026 12:00:00 GMT')
+    assert fetch(sheet_server, 'hw1', tmp_path) == (['kmishra9@berkeley.edu'], 'download')
+
+def test_unvalidated_sheets_are_only_parsed_once_changed(sheet_server, tmp_path):
+    sheet_server.sheets['hw1'] = Sheet(OSKI)
+
+    assert fetch(sheet_server, 'hw1', tmp_path) == (['oski@berkeley.edu'], 'download')
+    assert fetch(sheet_server, 'hw1', tmp_path) == (['oski@berkeley.edu'], 'unchanged')
+
+    sheet_server.sheets['hw1'].body = KUNAL
+    assert fetch(sheet_server, 'hw1', tmp_path) == (['kmishra9@berkeley.edu'], 'download')
+    assert sheet_server.requested == ['hw1'] * 3
+
+def test_offline_only_reads_the_cache(sheet_server, tmp_path):
+    sheet_server.sheets['hw1'] = Sheet(OSKI, etag='"v1"')
+    fetch(sheet_server, 'hw1', tmp_path)
+
+    assert fetch(sheet_server, 'hw1', tmp_path, offline=True) == (['oski@berkeley.edu'], 'offline')
+    assert sheet_server.requested == ['hw1']
+
+    with pytest.raises(AssertionError, match='has never been loaded'):
+        fetch(sheet_server, 'hw2', tmp_path, offline=True)
@@ -0,0 +1,94 @@
+import time
+import socket
+import argparse
+import threading
+from email.mime.text import MIMEText
+
+import pytest
+
+from suitcase.mailer import RateLimiter, new_run, read_journal, append_to_journal, queue_emails, send_emails
+
+Controller = pytest.importorskip('aiosmtpd.controller').Controller
+
+class GreylistingHandler:
+    """Turns every email away (451) the first time it is sent to its recipient, and refuses anyone at nobody@ outright"""
+
+    def __init__(self):
+        self.received, self.greylisted = [], set()
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address.startswith('nobody@'):   return '550 No such user here'
+        envelope.rcpt_tos.append(address)
+        return '250 OK'
+
+    async def handle_DATA(self, server, session, envelope):
+        recipient = envelope.rcpt_tos[0]
+        if recipient not in self.greylisted:
+            self.greylisted.add(recipient)
+            return '451 Try again later'
+        self.received.append(recipient)
+        return '250 OK'
+
+@pytest.fixture
+def smtp_server():
+    """A running GreylistingHandler, and the options send_emails needs to reach it"""
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+
+    handler    = GreylistingHandler()
+    controller = Controller(handler, hostname='127.0.0.1', port=port)
+    controller.start()
+    yield handler, argparse.Namespace(host='127.0.0.1', port=port, no_tls=True, no_login=True, connection_rate=0, retries=2, backoff=0.01)
+    controller.stop()
+
+def message(recipient):
+    msg = MIMEText("Hey y'all")
+    msg['Subject'], msg['From'], msg['To'] = 'HW3', 'suitcaseclass@gmail.com', recipient
+    return msg
+
+def send(emails, path, args, rate=0, resend_uncertain=False):
+    """Sends whichever of emails the journal at path says still need sending, and returns the recipients skipped as already sent and as uncertain"""
+    pending, already, uncertain = queue_emails(emails, read_journal(path)[0], resend_uncertain)
+    with open(path, 'a') as journal_file:
+        send_emails(pending, args, RateLimiter(rate), journal_file, threading.Lock())
+    return already, uncertain
+
+def test_greylisted_emails_are_retried_and_journaled(smtp_server, tmp_path):
+    handler, args = smtp_server
+    path, run     = str(tmp_path / 'sent_emails.journal'), new_run()
+    emails        = [ ((run, 'HW3', recipient), message(recipient)) for recipient in ['oski@berkeley.edu', 'kmishra9@berkeley.edu', 'nobody@berkeley.edu'] ]
+
+    #5 attempts (every email is greylisted once, and the refused one is never retried) at 10 per second overall
+    started = time.monotonic()
+    send(emails, path, args, rate=10)
+    assert time.monotonic() - started >= 0.4
+
+    assert sorted(handler.received) == ['kmishra9@berkeley.edu', 'oski@berkeley.edu']
+    statuses, last_run = read_journal(path)
+    assert [statuses[key] for key, msg in emails] == ['sent', 'sent', 'failed']
+    assert last_run == run
+
+def test_resuming_a_run_skips_whoever_it_emailed(smtp_server, tmp_path):
+    handler, args = smtp_server
+    path, run     = str(tmp_path / 'sent_emails.journal'), new_run()
+    emails        = [ ((run, 'HW3', recipient), message(recipient)) for recipient in ['oski@berkeley.edu', 'kmishra9@berkeley.edu'] ]
+    send(emails, path, args)
+
+    #An email that may or may not have gone out when the run crashed
+    emails.append( ((run, 'HW3', 'crash@berkeley.edu'), message('crash@berkeley.edu')) )
+    with open(path, 'a') as journal_file:
+        append_to_journal(journal_file, threading.Lock(), 'sending', emails[-1][0])
+
+    assert send(emails, path, args) == (['oski@berkeley.edu', 'kmishra9@berkeley.edu'], ['crash@berkeley.edu'])
+    assert 'crash@berkeley.edu' not in handler.received
+
+    assert send(emails, path, args, resend_uncertain=True) == (['oski@berkeley.edu', 'kmishra9@berkeley.edu'], [])
+    assert sorted(handler.received) == ['crash@berkeley.edu', 'kmishra9@berkeley.edu', 'oski@berkeley.edu']
+
+def test_a_new_run_emails_everyone_again(smtp_server, tmp_path):
+    handler, args = smtp_server
+    path          = str(tmp_path / 'sent_emails.journal')
+    for run in (new_run(), 'next run'):
+        assert send([ ((run, 'HW3', 'oski@berkeley.edu'), message('oski@berkeley.edu')) ], path, args) == ([], [])
+    assert handler.received == ['oski@berkeley.edu'] * 2
@@ -0,0 +1,49 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from sheet_server import Sheet
+from suitcase.service import SubmissionStatus, make_server
+
+@pytest.fixture
+def ask(sheet_server, tmp_path):
+    """Serves the status of a roster and two homeworks from sheet_server, and returns a function answering a GET of path with its (HTTP status, JSON answer)"""
+    sheet_server.sheets.update(roster=Sheet(b'First Name,Last Name,Email Address,UGSI\nOski,Bear,oski@berkeley.edu,Alice\nKunal,Mishra,kmishra9@berkeley.edu,Bob\n'),
+                               hw1=Sheet(b'Timestamp,Email Address\n1,oski@berkeley.edu\n2,kmishra9@berkeley.edu\n'),
+                               hw2=Sheet(b'Timestamp,Email Address\n1,kmishra9@berkeley.edu\n'))
+    status = SubmissionStatus(sheet_server.url('roster'), [sheet_server.url('hw1'), sheet_server.url('hw2')], loader_options=dict(cache_dir=None),
+                              state_dir=str(tmp_path / 'state'), alias_dir=str(tmp_path / 'aliases'))
+    status.refresh()
+    server = make_server(status, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    def ask(path):
+        try:
+            with urllib.request.urlopen('http://127.0.0.1:' + str(server.server_port) + path) as response:
+                return response.status, json.load(response)
+        except urllib.error.HTTPError as error:
+            return error.code, json.load(error)
+
+    yield ask
+    server.shutdown()
+    server.server_close()
+    status.close()
+
+def test_status_of_a_student(ask):
+    assert ask('/status?email=Oski@berkeley.edu&homework=2') == (200, {'email': 'oski@berkeley.edu', 'name': 'OskiBear', 'ugsi': 'Alice', 'missed': [2], 'homework': 2, 'submitted': False})
+    assert ask('/status?email=kmishra9')[1]['missed'] == []
+
+def test_status_of_an_email_off_the_roster(ask):
+    assert ask('/status?email=kmishra9@gmail.com')[0] == 404
+
+def test_missing_students_of_a_section(ask):
+    assert ask('/missing?ugsi=alice')[1]['students'] == [{'email': 'oski@berkeley.edu', 'name': 'OskiBear', 'ugsi': 'Alice', 'missed': [2]}]
+    assert ask('/missing?homework=1') == (200, {'homework': 1, 'ugsi': None, 'students': []})
+    assert ask('/missing?homework=7')[0] == 404
+
+def test_health(ask):
+    code, health = ask('/health')
+    assert (code, health['students'], health['homeworks'], health['last_error']) == (200, 2, [1, 2], None)